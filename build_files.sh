@@ -1,9 +1,10 @@
 #!/bin/bash
 
 # Install dependencies
-pip install -r requirements.txt
+pip install -r requirements.txt -r requirements-build.txt
 
-# Collect static files
+# Build, hash and compress static files
+python manage.py build_assets
 python manage.py collectstatic --noinput
 
 # Make migrations
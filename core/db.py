@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Set while a view marked with @read_replica handles a request that isn't pinned to the primary
+_reading_replica = ContextVar('reading_replica', default=False)
+
+_replica_lock = threading.Lock()
+_replica_available = False
+_replica_checked_at = None
+
+# Replication delay in seconds; 0 when the replica has replayed everything it
+# received, so an idle primary doesn't look like lag
+REPLICA_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+
+class StatementTimeout:
+    """
+    ``execute_wrapper`` hook that limits each PostgreSQL statement to
+    ``milliseconds``. The limit is sent as ``SET LOCAL`` in the same query
+    string, so it lasts for that statement's (implicit or explicit)
+    transaction only. Nothing is left behind on the connection, which keeps
+    it safe behind PgBouncer in transaction pooling mode, and it costs no
+    extra round trip.
+
+    ``executemany`` calls and server-side cursors can't be prefixed and run
+    under the connection's default timeout.
+    """
+
+    def __init__(self, milliseconds):
+        self.prefix = f'SET LOCAL statement_timeout = {int(milliseconds)}; '
+
+    def __call__(self, execute, sql, params, many, context):
+        if many or getattr(context['cursor'].cursor, 'name', None):
+            return execute(sql, params, many, context)
+        return execute(self.prefix + sql, params, many, context)
+
+
+def statement_timeout(timeout_class):
+    """
+    Run the view with the STATEMENT_TIMEOUTS limit for ``timeout_class``
+    (e.g. ``'list'`` for searches, ``'import'`` for file imports) on every
+    PostgreSQL connection. Other databases have no statement timeout and are
+    left alone.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            timeout = StatementTimeout(settings.STATEMENT_TIMEOUTS[timeout_class])
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    if connection.vendor == 'postgresql':
+                        stack.enter_context(connection.execute_wrapper(timeout))
+                return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def replica_lag(alias):
+    """Seconds ``alias`` is behind the primary (0 for databases that aren't streaming replicas)."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL if connection.vendor == 'postgresql' else 'SELECT 0')
+        return float(cursor.fetchone()[0] or 0)
+
+
+def replica_available():
+    """
+    Whether reads may go to the replica: it answers and is no more than
+    REPLICA_MAX_LAG_SECONDS behind. Checked at most every
+    REPLICA_CHECK_INTERVAL seconds per process; while one thread checks,
+    others use the last answer.
+    """
+    global _replica_available, _replica_checked_at
+
+    interval = settings.REPLICA_CHECK_INTERVAL
+    if _replica_checked_at is not None and time.monotonic() - _replica_checked_at < interval:
+        return _replica_available
+    if not _replica_lock.acquire(blocking=_replica_checked_at is None):
+        return _replica_available
+
+    try:
+        if _replica_checked_at is None or time.monotonic() - _replica_checked_at >= interval:
+            alias = settings.REPLICA_DATABASE
+            try:
+                lag = replica_lag(alias)
+            except DatabaseError:
+                logger.warning('Replica %r is unavailable; reading from the primary', alias, exc_info=True)
+                available = False
+            else:
+                available = lag <= settings.REPLICA_MAX_LAG_SECONDS
+                if not available:
+                    logger.warning('Replica %r is %.1fs behind; reading from the primary', alias, lag)
+            _replica_available = available
+            _replica_checked_at = time.monotonic()
+        return _replica_available
+    finally:
+        _replica_lock.release()
+
+
+class ReplicaRouter:
+    """
+    Sends reads made by ``@read_replica`` views to REPLICA_DATABASE while it
+    is available and keeps everything else, and all writes, on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.REPLICA_DATABASE and _reading_replica.get() and replica_available():
+            return settings.REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+def pinned_to_primary(request):
+    """Whether the client wrote recently enough that the replica may not have its changes yet."""
+    return settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+
+def read_replica(view_func):
+    """
+    Let ``view_func`` (sync or async) read from the replica. Clients that
+    changed customers in the last REPLICA_PIN_SECONDS keep reading from the
+    primary, so they always see their own changes.
+
+    Only for read-only pages where data a few seconds old is harmless and
+    that hand out no ``Customer.version`` for a later write: dashboards,
+    reports and history. Forms and pages with status or assignment controls
+    stay on the primary, so a compare-and-swap never starts from a stale
+    version.
+    """
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            token = _reading_replica.set(not pinned_to_primary(request))
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _reading_replica.reset(token)
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            token = _reading_replica.set(not pinned_to_primary(request))
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                _reading_replica.reset(token)
+    return wrapper
@@ -0,0 +1,75 @@
+"""
+Gunicorn configuration for production.
+
+Usage::
+
+    gunicorn -c python:core.gunicorn_conf core.wsgi:application
+
+Every value can be overridden with the environment variable named next to it.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _cpu_count():
+    # Respect CPU affinity (e.g. container cpusets) where the platform exposes it
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+CPUS = _cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Threaded sync workers: the classic 2 * cores + 1 processes, each serving a
+# couple of requests at once while others wait on the database
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', CPUS * 2 + 1))
+# Only used by the gthread worker class
+threads = int(os.getenv('GUNICORN_THREADS', 2))
+
+# Import the application once in the master so workers fork with it already
+# loaded (copy-on-write) and a broken deploy fails before any worker starts
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Recycle workers to bound memory growth; the jitter keeps them from all
+# restarting at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Restart a worker whose main loop stops heartbeating for this long. gthread
+# workers heartbeat while requests run in their threads, so this catches hung
+# processes, not slow requests; per-view budgets come from the statement
+# timeouts (STATEMENT_TIMEOUTS) and the proxy (nginx/conf.d/app.conf).
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Heartbeat files on tmpfs; a disk-backed /tmp can stall workers in containers
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Start every deploy with empty metrics; workers re-create their files."""
+    directory = os.getenv('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.startswith('metrics-'):
+                os.remove(os.path.join(directory, name))
+
+
+def post_worker_init(worker):
+    """Warm the freshly forked worker before it accepts its first request."""
+    from core.warmup import warm_up
+
+    warm_up()
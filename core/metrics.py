@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+# Upper bounds in seconds; the implicit +Inf bucket is the request count
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stats for the request being handled, if it is instrumented
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Timings collected while handling one request."""
+
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth', 'connections', '_lock')
+
+    def __init__(self):
+        # Dashboard aggregates report queries from pool threads too
+        self._lock = threading.Lock()
+        self.queries = 0
+        # New database connections opened; 0 means the worker reused its own
+        self.connections = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.db_time += elapsed
+                self.queries += 1
+
+
+def begin_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+_original_template_render = DjangoTemplate.render
+
+
+def _timed_template_render(self, context=None, request=None):
+    stats = _current.get()
+    if stats is None:
+        return _original_template_render(self, context, request)
+    # Only the outermost render counts; render_to_string in a tag is already inside it
+    stats.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context, request)
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - start
+
+
+def instrument_templates():
+    DjangoTemplate.render = _timed_template_render
+
+
+def _connection_created(sender, connection, **kwargs):
+    stats = _current.get()
+    if stats is not None:
+        with stats._lock:
+            stats.connections += 1
+
+
+def instrument_connections():
+    connection_created.connect(_connection_created, dispatch_uid='core.metrics.connections')
+
+
+class MetricsRegistry:
+    """
+    Per-process latency histograms and DB/template totals by view name.
+
+    With ``METRICS_DIR`` set, each process also writes its totals to a file
+    there (at most every ``METRICS_FLUSH_INTERVAL`` seconds) and the metrics
+    endpoint adds up every file, so a scrape covers all workers, including
+    ones that have since been recycled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._next_flush = 0.0
+
+    def observe(self, view, duration, stats):
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = {
+                    'buckets': [0] * len(LATENCY_BUCKETS),
+                    'count': 0,
+                    'sum': 0.0,
+                    'queries': 0,
+                    'db_seconds': 0.0,
+                    'template_seconds': 0.0,
+                    'connections': 0,
+                }
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    entry['buckets'][index] += 1
+                    break
+            entry['count'] += 1
+            entry['sum'] += duration
+            entry['queries'] += stats.queries
+            entry['db_seconds'] += stats.db_time
+            entry['template_seconds'] += stats.template_time
+            entry['connections'] += stats.connections
+
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if directory and time.monotonic() >= self._next_flush:
+            self.flush(directory)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {**entry, 'buckets': list(entry['buckets'])}
+                for view, entry in self._views.items()
+            }
+
+    def flush(self, directory):
+        self._next_flush = time.monotonic() + getattr(settings, 'METRICS_FLUSH_INTERVAL', 1)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, path)
+
+    def collect(self):
+        """Return the totals for this process, or for every process when ``METRICS_DIR`` is set."""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return self.snapshot()
+
+        self.flush(directory)
+        totals = {}
+        # Files of recycled workers stay, so the totals never go backwards
+        for name in os.listdir(directory):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    views = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for view, entry in views.items():
+                total = totals.setdefault(view, {
+                    'buckets': [0] * len(LATENCY_BUCKETS),
+                    'count': 0,
+                    'sum': 0.0,
+                    'queries': 0,
+                    'db_seconds': 0.0,
+                    'template_seconds': 0.0,
+                    'connections': 0,
+                })
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+                for key in ('count', 'sum', 'queries', 'db_seconds', 'template_seconds', 'connections'):
+                    total[key] += entry.get(key, 0)
+        return totals
+
+
+registry = MetricsRegistry()
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(views):
+    lines = [
+        '# HELP django_request_duration_seconds Request latency by view.',
+        '# TYPE django_request_duration_seconds histogram',
+    ]
+    for view, entry in sorted(views.items()):
+        label = _label(view)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, entry['buckets']):
+            cumulative += count
+            lines.append(f'django_request_duration_seconds_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'django_request_duration_seconds_bucket{{view="{label}",le="+Inf"}} {entry["count"]}')
+        lines.append(f'django_request_duration_seconds_sum{{view="{label}"}} {entry["sum"]:.6f}')
+        lines.append(f'django_request_duration_seconds_count{{view="{label}"}} {entry["count"]}')
+
+    for name, key, help_text in (
+        ('django_request_db_queries_total', 'queries', 'Database queries by view.'),
+        ('django_request_db_seconds_total', 'db_seconds', 'Time spent in database queries by view.'),
+        ('django_request_template_seconds_total', 'template_seconds', 'Time spent rendering templates by view.'),
+        ('django_request_db_connections_total', 'connections', 'Database connections opened (not reused) by view.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for view, entry in sorted(views.items()):
+            value = entry[key]
+            value = f'{value:.6f}' if isinstance(value, float) else value
+            lines.append(f'{name}{{view="{_label(view)}"}} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# SHOW POOLS columns exported as gauges
+PGBOUNCER_POOL_GAUGES = (
+    ('cl_active', 'Client connections paired with a server connection.'),
+    ('cl_waiting', 'Client connections waiting for a server connection.'),
+    ('sv_active', 'Server connections in use by a client.'),
+    ('sv_idle', 'Server connections idle and ready for a client.'),
+    ('sv_used', 'Server connections idle long enough to need a check before reuse.'),
+    ('maxwait', 'Seconds the oldest waiting client has been waiting.'),
+)
+
+
+def pgbouncer_pools():
+    """Rows of PgBouncer's ``SHOW POOLS`` as dicts, read from PGBOUNCER_STATS_URL."""
+    import psycopg2
+
+    connection = psycopg2.connect(settings.PGBOUNCER_STATS_URL, connect_timeout=2)
+    try:
+        # The admin console doesn't support transactions
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW POOLS')
+            columns = [column.name for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+
+def render_pgbouncer(pools):
+    """Prometheus text for ``pgbouncer_pools()`` output, or for a failed read when ``pools`` is None."""
+    lines = [
+        '# HELP pgbouncer_up Whether PgBouncer answered the stats query.',
+        '# TYPE pgbouncer_up gauge',
+        f'pgbouncer_up {0 if pools is None else 1}',
+    ]
+    for column, help_text in PGBOUNCER_POOL_GAUGES:
+        name = f'pgbouncer_pool_{column}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for pool in pools or ():
+            if column in pool:
+                labels = f'database="{_label(pool["database"])}",user="{_label(pool["user"])}"'
+                lines.append(f'{name}{{{labels}}} {pool[column]}')
+    return '\n'.join(lines) + '\n'
+
+
+@never_cache
+def metrics(request):
+    """
+    Prometheus metrics endpoint. Only available with
+    PERFORMANCE_INSTRUMENTATION on and METRICS_TOKEN set, which the scraper
+    must send as a bearer token. With PGBOUNCER_STATS_URL set, PgBouncer's
+    pool usage is read at scrape time and included.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not getattr(settings, 'PERFORMANCE_INSTRUMENTATION', False) or not token:
+        raise Http404
+
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden('Invalid metrics token')
+
+    body = render_prometheus(registry.collect())
+    if getattr(settings, 'PGBOUNCER_STATS_URL', ''):
+        try:
+            pools = pgbouncer_pools()
+        except Exception:
+            pools = None
+        body += render_pgbouncer(pools)
+
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
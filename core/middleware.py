@@ -1,53 +1,164 @@
 import os
-import re
-import logging
+import time
+from contextlib import ExitStack
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.shortcuts import render
-from django.utils.deprecation import MiddlewareMixin
+from core import metrics
+from core.nplusone import detect_repeated_queries
+from customer.events import tracked
 
-logger = logging.getLogger(__name__)
 
-
-class MaintenanceModeMiddleware(MiddlewareMixin):
+class PerformanceMiddleware:
+    """
+    Opt-in per-request instrumentation, enabled by PERFORMANCE_INSTRUMENTATION.
+
+    Counts and times database queries (through ``execute_wrapper``), times
+    template rendering and the whole request, counts new database
+    connections, reports them in a ``Server-Timing`` header and adds them to
+    the per-view totals served at /metrics/, including the queries the
+    concurrent dashboard aggregates run on pool threads. When disabled the
+    middleware removes itself from the stack.
     """
-    Middleware to display a maintenance page when MAINTENANCE_MODE is enabled.
 
-    To enable maintenance mode, set MAINTENANCE_MODE=True in your .env file
-    or as an environment variable.
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.instrument_templates()
+        metrics.instrument_connections()
+
+    def __call__(self, request):
+        stats, token = metrics.begin_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        metrics.registry.observe(match.view_name if match else '<unresolved>', duration, stats)
+
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries, {stats.connections} connects", '
+            f'tpl;dur={stats.template_time * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        return response
+
+
+class QueryRepeatMiddleware:
+    """
+    Development and test aid, enabled by NPLUSONE_DETECTION: fingerprints
+    the SQL of each request and reports shapes repeated more than
+    NPLUSONE_THRESHOLD times, which is usually an N+1 pattern. Raises
+    ``NPlusOneError`` instead of logging when NPLUSONE_RAISE is on.
     """
 
-    def process_request(self, request):
-        # Check if maintenance mode is enabled
-        maintenance_mode = os.getenv('MAINTENANCE_MODE', 'False') == 'True'
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_DETECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def label():
+            match = request.resolver_match
+            return f'view {match.view_name}' if match else request.path
+
+        with detect_repeated_queries(label):
+            return self.get_response(request)
 
-        # Skip maintenance mode for certain IPs
-        if maintenance_mode:
-            # Allow access to static files
-            if request.path.startswith('/static/') or request.path.startswith('/media/'):
-                return None
 
-            # Allow access to the admin site
-            if request.path.startswith('/admin/'):
-                return None
+class SiteMiddleware:
+    """
+    Maintenance mode and security headers in one middleware.
+
+    Everything that doesn't change between requests (allowed IPs, the header
+    set, path prefixes) is worked out once at startup. Static and media
+    requests are passed straight through.
 
-            # Allow access to health check endpoint
-            if request.path == '/health/':
-                return None
+    Maintenance mode is on while MAINTENANCE_MODE=True or while the file at
+    MAINTENANCE_FLAG_FILE exists. The file is checked at most every
+    MAINTENANCE_POLL_INTERVAL seconds, so it can be toggled without a restart:
 
-            # Check for allowed IPs
-            allowed_ips = os.getenv('MAINTENANCE_ALLOWED_IPS', '').split(',')
-            client_ip = self._get_client_ip(request)
+        touch maintenance.flag    # enable
+        rm maintenance.flag       # disable
+    """
 
-            if client_ip and client_ip in allowed_ips:
-                return None
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        self.passthrough_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL)
+            if prefix and prefix.startswith('/')
+        )
+        # Reachable during maintenance so admins and monitors keep working
+        self.maintenance_exempt_prefixes = ('/admin/', '/health/')
+
+        self.maintenance_always_on = settings.MAINTENANCE_MODE
+        self.maintenance_allowed_ips = frozenset(settings.MAINTENANCE_ALLOWED_IPS)
+        self.maintenance_flag_file = settings.MAINTENANCE_FLAG_FILE
+        self.maintenance_poll_interval = settings.MAINTENANCE_POLL_INTERVAL
+        self._maintenance_flagged = False
+        self._next_poll = 0.0
+
+        self.security_headers = (
+            ('Content-Security-Policy', (
+                "default-src 'self'; "
+                "script-src 'self' 'unsafe-inline'; "
+                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+                "img-src 'self' data:; "
+                "font-src 'self' data: https://fonts.gstatic.com; "
+                "connect-src 'self'; "
+                "frame-ancestors 'none'; "
+                "form-action 'self';"
+            )),
+            ('X-Content-Type-Options', 'nosniff'),
+            ('X-Frame-Options', 'DENY'),
+            ('X-XSS-Protection', '1; mode=block'),
+            ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+            ('Permissions-Policy', 'camera=(), microphone=(), geolocation=()'),
+        )
+        # HSTS only in production
+        if not settings.DEBUG:
+            self.security_headers += (
+                ('Strict-Transport-Security', 'max-age=31536000; includeSubDomains; preload'),
+            )
+
+    def __call__(self, request):
+        path = request.path
+        if path.startswith(self.passthrough_prefixes):
+            return self.get_response(request)
+
+        if (
+            self.maintenance_enabled()
+            and not path.startswith(self.maintenance_exempt_prefixes)
+            and self._get_client_ip(request) not in self.maintenance_allowed_ips
+        ):
+            response = render(request, 'maintenance.html', {'COMPANY_NAME': settings.COMPANY_NAME}, status=503)
+        else:
+            response = self.get_response(request)
 
-            # Show maintenance page
-            context = {
-                'COMPANY_NAME': settings.COMPANY_NAME,
-            }
-            return render(request, 'maintenance.html', context, status=503)
+        headers = response.headers
+        for name, value in self.security_headers:
+            headers.setdefault(name, value)
+        return response
 
-        return None
+    def maintenance_enabled(self):
+        if self.maintenance_always_on:
+            return True
+        if not self.maintenance_flag_file:
+            return False
+        now = time.monotonic()
+        if now >= self._next_poll:
+            self._maintenance_flagged = os.path.exists(self.maintenance_flag_file)
+            self._next_poll = now + self.maintenance_poll_interval
+        return self._maintenance_flagged
 
     def _get_client_ip(self, request):
         """Get the client's IP address from the request."""
@@ -59,65 +170,45 @@ class MaintenanceModeMiddleware(MiddlewareMixin):
         return ip
 
 
-class DebugStaticFilesMiddleware(MiddlewareMixin):
+class CustomerChangeMiddleware:
     """
-    Middleware to debug static file serving issues.
+    Middleware to note whether a request committed any customer change
+    events, as ``request.changed_customers``.
     """
 
-    def process_request(self, request):
-        if request.path.startswith('/static/'):
-            logger.info(f"Static file requested: {request.path}")
-            logger.info(f"STATIC_URL: {settings.STATIC_URL}")
-            logger.info(f"STATIC_ROOT: {settings.STATIC_ROOT}")
-            logger.info(f"STATICFILES_DIRS: {settings.STATICFILES_DIRS}")
-            logger.info(f"STATICFILES_STORAGE: {settings.STATICFILES_STORAGE}")
-        return None
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracked() as events:
+            response = self.get_response(request)
+        request.changed_customers = bool(events)
+        return response
 
 
-class SecurityHeadersMiddleware(MiddlewareMixin):
+class ReplicaPinMiddleware:
     """
-    Middleware to add security headers to all responses.
+    Read-your-writes for the read replica: after a successful (2xx/3xx)
+    request that committed customer changes, the client gets a cookie that
+    keeps its ``@read_replica`` views on the primary for
+    REPLICA_PIN_SECONDS. Failed requests and writes that replica views don't
+    show (logins, sessions) don't pin. Relies on CustomerChangeMiddleware
+    running inside it. Removes itself when no replica is configured.
     """
 
-    def process_response(self, request, response):
-        # Only add security headers if not already present and not for static/media files
-        if not request.path.startswith('/static/') and not request.path.startswith('/media/'):
-            # Content Security Policy
-            if not response.has_header('Content-Security-Policy'):
-                csp = (
-                    "default-src 'self'; "
-                    "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdn.tailwindcss.com; "
-                    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com; "
-                    "img-src 'self' data:; "
-                    "font-src 'self' data: https://fonts.gstatic.com https://cdnjs.cloudflare.com; "
-                    "connect-src 'self'; "
-                    "frame-ancestors 'none'; "
-                    "form-action 'self';"
-                )
-                response['Content-Security-Policy'] = csp
-
-            # X-Content-Type-Options
-            if not response.has_header('X-Content-Type-Options'):
-                response['X-Content-Type-Options'] = 'nosniff'
-
-            # X-Frame-Options
-            if not response.has_header('X-Frame-Options'):
-                response['X-Frame-Options'] = 'DENY'
-
-            # X-XSS-Protection
-            if not response.has_header('X-XSS-Protection'):
-                response['X-XSS-Protection'] = '1; mode=block'
-
-            # Referrer-Policy
-            if not response.has_header('Referrer-Policy'):
-                response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-
-            # Permissions-Policy
-            if not response.has_header('Permissions-Policy'):
-                response['Permissions-Policy'] = 'camera=(), microphone=(), geolocation=()'
-
-            # HSTS (only in production)
-            if not settings.DEBUG and not response.has_header('Strict-Transport-Security'):
-                response['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains; preload'
-
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, 'changed_customers', False) and 200 <= response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
         return response
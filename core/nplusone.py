@@ -0,0 +1,85 @@
+import logging
+import os
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+class NPlusOneError(Exception):
+    """Raised when NPLUSONE_RAISE is on and a query shape repeats too often."""
+
+
+def fingerprint(sql):
+    """
+    Reduce ``sql`` to its shape: literals become ``?`` and placeholder lists
+    of any length become ``(...)``, so ``WHERE id = 1`` and ``WHERE id = 2``
+    or ``IN (%s)`` and ``IN (%s, %s)`` compare equal.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+def _origin():
+    """Return "path:line in function" for the innermost project frame issuing the query."""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(base_dir) and path != __file__ and 'site-packages' not in path:
+            return f'{os.path.relpath(path, base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown origin'
+
+
+class QueryRepeatDetector:
+    """
+    ``execute_wrapper`` hook counting queries by fingerprint. The first time
+    a shape runs more than ``threshold`` times it is logged, or raised as
+    ``NPlusOneError``, with the view and the line that issued it.
+    """
+
+    def __init__(self, label='', threshold=None, raise_error=None):
+        self.label = label
+        self.threshold = settings.NPLUSONE_THRESHOLD if threshold is None else threshold
+        self.raise_error = settings.NPLUSONE_RAISE if raise_error is None else raise_error
+        self.counts = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = fingerprint(sql)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count == self.threshold + 1:
+            label = self.label() if callable(self.label) else self.label
+            message = (
+                f'Possible N+1: more than {self.threshold} queries of the same shape'
+                f'{f" in {label}" if label else ""} from {_origin()}: {shape}'
+            )
+            if self.raise_error:
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return execute(sql, params, many, context)
+
+    @property
+    def repeated(self):
+        """{fingerprint: count} for every shape above the threshold."""
+        return {shape: count for shape, count in self.counts.items() if count > self.threshold}
+
+
+@contextmanager
+def detect_repeated_queries(label='', threshold=None, raise_error=None):
+    """Watch every database connection on this thread for repeated query shapes."""
+    detector = QueryRepeatDetector(label, threshold, raise_error)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
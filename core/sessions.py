@@ -0,0 +1,27 @@
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBSessionStore
+
+
+class SessionStore(CachedDBSessionStore):
+    """
+    Cache-first session store that skips the write when a request marked the
+    session modified but left its contents as they were loaded (e.g. setting
+    a key to the value it already had).
+    """
+
+    def _fingerprint(self, data):
+        return self.serializer().dumps(data)
+
+    def load(self):
+        data = super().load()
+        self._loaded_fingerprint = self._fingerprint(data)
+        return data
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and self.session_key is not None
+            and getattr(self, '_loaded_fingerprint', None) == self._fingerprint(self._session)
+        ):
+            return
+        super().save(must_create=must_create)
+        self._loaded_fingerprint = self._fingerprint(self._get_session(no_load=must_create))
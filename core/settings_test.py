@@ -0,0 +1,17 @@
+"""
+Settings for the test suite. ``manage.py test`` uses them by default.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+# Fail tests that introduce N+1 query patterns
+NPLUSONE_DETECTION = True
+NPLUSONE_RAISE = True
+
+# Tests don't run collectstatic, so there is no manifest to look names up in
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+# A second, separate database standing in for the read replica. Reads are
+# only routed to it in the tests that turn REPLICA_DATABASE on.
+DATABASES['replica'] = {**DATABASES['default'], 'NAME': f"{DATABASES['default']['NAME']}_replica"}  # noqa: F405
+REPLICA_DATABASE = None
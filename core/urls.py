@@ -2,12 +2,17 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from customer.health import health_check
+from core.metrics import metrics
+from customer import health
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('customer.urls')),
-    path('health/', health_check, name='health_check'),
+    path('health/', health.ready, name='health_check'),
+    path('health/live/', health.live, name='health_live'),
+    path('health/ready/', health.ready, name='health_ready'),
+    path('health/deep/', health.deep, name='health_deep'),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 # Always serve static files in development
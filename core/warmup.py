@@ -0,0 +1,44 @@
+import logging
+import time
+
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+# Templates behind the pages hit first after a deploy
+HOT_TEMPLATES = [
+    'base.html',
+    'customer/login.html',
+    'customer/manager_dashboard.html',
+    'customer/sales_dashboard.html',
+    'customer/customer_status.html',
+    'customer/customer_list.html',
+    'customer/customer_detail.html',
+    'includes/customer_history.html',
+    'includes/customer_assignment.html',
+    'includes/pagination.html',
+]
+
+
+def warm_up():
+    """
+    Do the one-off work a worker would otherwise do on its first requests:
+    build the URL resolver and compile the hot templates into the cached
+    template loader. Failures are logged, not raised.
+
+    Database connections are per thread and requests run on the worker's
+    own threads, so there is no connection to open here.
+    """
+    start = time.perf_counter()
+
+    # reverse_dict builds the full resolver, including included URLconfs
+    get_resolver().reverse_dict
+
+    for name in HOT_TEMPLATES:
+        try:
+            get_template(name)
+        except Exception:
+            logger.exception('Warm-up could not compile template %r', name)
+
+    logger.info('Worker warmed up in %.0fms', (time.perf_counter() - start) * 1000)
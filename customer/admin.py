@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.forms.models import BaseInlineFormSet
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
-from .models import User, Customer, FileImport, CustomerStatusHistory, CustomerStatus
+from .models import User, Customer, FileImport, CustomerStatusHistory
+from .presentation import admin_status_change, presentation
 
 # Register site header, title, and index title
 admin.site.site_header = 'ALIMS.CO.IN Administration'
@@ -20,6 +22,7 @@ class CustomUserAdmin(UserAdmin):
         (None, {'fields': ('username', 'password')}),
         (_('Personal info'), {'fields': ('first_name', 'last_name', 'email')}),
         (_('Role'), {'fields': ('role',)}),
+        (_('Auto-assignment'), {'fields': ('capacity', 'areas')}),
         (_('Permissions'), {
             'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions'),
             'classes': ('collapse',),
@@ -43,23 +46,38 @@ class CustomUserAdmin(UserAdmin):
     role_badge.short_description = 'Role'
     role_badge.admin_order_field = 'role'
 
+# Newest history entries shown inline on the customer page
+HISTORY_INLINE_LIMIT = 20
+
+class RecentHistoryFormSet(BaseInlineFormSet):
+    def get_queryset(self):
+        # Only the newest entries; the full history is linked from the customer page
+        if not hasattr(self, '_recent'):
+            self._recent = super().get_queryset().order_by('-changed_at')[:HISTORY_INLINE_LIMIT]
+        return self._recent
+
 class CustomerStatusHistoryInline(admin.TabularInline):
     model = CustomerStatusHistory
+    formset = RecentHistoryFormSet
     extra = 0
     readonly_fields = ('previous_status', 'new_status', 'changed_by', 'changed_at')
     can_delete = False
     verbose_name = 'Status History'
-    verbose_name_plural = 'Status History'
+    verbose_name_plural = f'Status History (latest {HISTORY_INLINE_LIMIT})'
 
     def has_add_permission(self, request, obj=None):
         return False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('changed_by')
+
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ('name', 'phone_number', 'area', 'date', 'status_badge', 'assigned_to_link', 'created_at')
+    list_select_related = ('assigned_to',)
     list_filter = ('status', 'assigned_to', 'date', 'created_at')
     search_fields = ('name', 'phone_number', 'area', 'notes', 'remark')
     date_hierarchy = 'created_at'
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'status_history_link')
     inlines = [CustomerStatusHistoryInline]
     list_per_page = 25
     save_on_top = True
@@ -69,7 +87,7 @@ class CustomerAdmin(admin.ModelAdmin):
             'fields': ('name', 'phone_number', 'area', 'date')
         }),
         (_('Status & Assignment'), {
-            'fields': ('status', 'assigned_to')
+            'fields': ('status', 'assigned_to', 'status_history_link')
         }),
         (_('Additional Information'), {
             'fields': ('remark', 'notes')
@@ -81,32 +99,7 @@ class CustomerAdmin(admin.ModelAdmin):
     ]
 
     def status_badge(self, obj):
-        if not obj.status:
-            return format_html('<span style="background-color: #E0E0E0; color: #616161; padding: 3px 8px; border-radius: 10px; font-size: 0.8em;"><i class="fas fa-question-circle"></i> No Status</span>')
-
-        status_styles = {
-            'INVALID': {'bg': '#FFCDD2', 'color': '#C62828', 'icon': 'fas fa-times-circle'},
-            'VALID': {'bg': '#C8E6C9', 'color': '#2E7D32', 'icon': 'fas fa-check-circle'},
-            'CALL_NOT_ATTENDED': {'bg': '#FFF9C4', 'color': '#F57F17', 'icon': 'fas fa-phone-slash'},
-            'PLAN_PRESENTED': {'bg': '#E1BEE7', 'color': '#6A1B9A', 'icon': 'fas fa-file-alt'},
-            'INTERESTED': {'bg': '#BBDEFB', 'color': '#1565C0', 'icon': 'fas fa-thumbs-up'},
-            'NOT_INTERESTED': {'bg': '#CFD8DC', 'color': '#455A64', 'icon': 'fas fa-thumbs-down'},
-            'FOLLOW_UP': {'bg': '#C5CAE9', 'color': '#283593', 'icon': 'fas fa-calendar-check'},
-            'SHORTLISTED': {'bg': '#B2DFDB', 'color': '#00695C', 'icon': 'fas fa-star'},
-            'CAMPUS_VISIT': {'bg': '#FFCC80', 'color': '#EF6C00', 'icon': 'fas fa-building'},
-            'REGISTRATION': {'bg': '#80CBC4', 'color': '#00796B', 'icon': 'fas fa-clipboard-list'},
-            'ADMISSION': {'bg': '#F8BBD0', 'color': '#AD1457', 'icon': 'fas fa-graduation-cap'},
-        }
-
-        style = status_styles.get(obj.status, {'bg': '#E0E0E0', 'color': '#616161', 'icon': 'fas fa-question-circle'})
-        label = dict(CustomerStatus.choices).get(obj.status, obj.status)
-
-        return format_html(
-            '<span style="background-color: {}; color: {}; padding: 3px 8px; border-radius: 10px; font-size: 0.8em;">' +
-            '<i class="{}"></i> {}' +
-            '</span>',
-            style['bg'], style['color'], style['icon'], label
-        )
+        return presentation(obj.status).admin_badge
 
     status_badge.short_description = 'Status'
     status_badge.admin_order_field = 'status'
@@ -130,6 +123,14 @@ class CustomerAdmin(admin.ModelAdmin):
     assigned_to_link.short_description = 'Assigned To'
     assigned_to_link.admin_order_field = 'assigned_to'
 
+    def status_history_link(self, obj):
+        if not obj.pk:
+            return '-'
+        url = reverse('admin:customer_customerstatushistory_changelist')
+        return format_html('<a href="{}?customer__id__exact={}">View full status history</a>', url, obj.pk)
+
+    status_history_link.short_description = 'Status History'
+
 class FileImportAdmin(admin.ModelAdmin):
     list_display = ('file_name', 'imported_by', 'imported_at', 'success_rate', 'total_records')
     list_filter = ('imported_by', 'imported_at')
@@ -194,46 +195,7 @@ class CustomerStatusHistoryAdmin(admin.ModelAdmin):
     customer_link.admin_order_field = 'customer__name'
 
     def status_change(self, obj):
-        status_styles = {
-            'INVALID': {'bg': '#FFCDD2', 'color': '#C62828', 'icon': 'fas fa-times-circle'},
-            'VALID': {'bg': '#C8E6C9', 'color': '#2E7D32', 'icon': 'fas fa-check-circle'},
-            'CALL_NOT_ATTENDED': {'bg': '#FFF9C4', 'color': '#F57F17', 'icon': 'fas fa-phone-slash'},
-            'PLAN_PRESENTED': {'bg': '#E1BEE7', 'color': '#6A1B9A', 'icon': 'fas fa-file-alt'},
-            'INTERESTED': {'bg': '#BBDEFB', 'color': '#1565C0', 'icon': 'fas fa-thumbs-up'},
-            'NOT_INTERESTED': {'bg': '#CFD8DC', 'color': '#455A64', 'icon': 'fas fa-thumbs-down'},
-            'FOLLOW_UP': {'bg': '#C5CAE9', 'color': '#283593', 'icon': 'fas fa-calendar-check'},
-            'SHORTLISTED': {'bg': '#B2DFDB', 'color': '#00695C', 'icon': 'fas fa-star'},
-            'CAMPUS_VISIT': {'bg': '#FFCC80', 'color': '#EF6C00', 'icon': 'fas fa-building'},
-            'REGISTRATION': {'bg': '#80CBC4', 'color': '#00796B', 'icon': 'fas fa-clipboard-list'},
-            'ADMISSION': {'bg': '#F8BBD0', 'color': '#AD1457', 'icon': 'fas fa-graduation-cap'},
-        }
-
-        if obj.previous_status:
-            prev_style = status_styles.get(obj.previous_status, {'bg': '#E0E0E0', 'color': '#616161', 'icon': 'fas fa-question-circle'})
-            prev_label = dict(CustomerStatus.choices).get(obj.previous_status, obj.previous_status)
-            prev_badge = format_html(
-                '<span style="background-color: {}; color: {}; padding: 3px 8px; border-radius: 10px; font-size: 0.8em; margin-right: 5px;">' +
-                '<i class="{}"></i> {}' +
-                '</span>',
-                prev_style['bg'], prev_style['color'], prev_style['icon'], prev_label
-            )
-        else:
-            prev_badge = format_html(
-                '<span style="background-color: #E0E0E0; color: #616161; padding: 3px 8px; border-radius: 10px; font-size: 0.8em; margin-right: 5px;">' +
-                '<i class="fas fa-question-circle"></i> None' +
-                '</span>'
-            )
-
-        new_style = status_styles.get(obj.new_status, {'bg': '#E0E0E0', 'color': '#616161', 'icon': 'fas fa-question-circle'})
-        new_label = dict(CustomerStatus.choices).get(obj.new_status, obj.new_status)
-        new_badge = format_html(
-            '<span style="background-color: {}; color: {}; padding: 3px 8px; border-radius: 10px; font-size: 0.8em;">' +
-            '<i class="{}"></i> {}' +
-            '</span>',
-            new_style['bg'], new_style['color'], new_style['icon'], new_label
-        )
-
-        return format_html('{} <i class="fas fa-arrow-right" style="margin: 0 5px;"></i> {}', prev_badge, new_badge)
+        return admin_status_change(obj.previous_status, obj.new_status)
 
     status_change.short_description = 'Status Change'
 
@@ -0,0 +1,127 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import CustomerStatus, CustomerStatusHistory, CustomerStatusHistoryArchive, User
+
+ARCHIVE_FIELDS = ('id', 'customer_id', 'previous_status', 'new_status', 'changed_by_id', 'changed_at', 'notes')
+
+
+class ArchiveResult:
+    """Outcome of one archival run."""
+
+    def __init__(self, archived, elapsed):
+        self.archived = archived
+        self.elapsed = elapsed
+
+
+def _old_history(days):
+    if days is None:
+        days = getattr(settings, 'HISTORY_ARCHIVE_AFTER_DAYS', 180)
+    cutoff = timezone.now() - timedelta(days=days)
+    return CustomerStatusHistory.objects.filter(changed_at__lt=cutoff, follow_up_reminder__isnull=True)
+
+
+def _beyond_recent(history, keep_recent):
+    if keep_recent is None:
+        keep_recent = getattr(settings, 'HISTORY_KEEP_RECENT', 5)
+    return (
+        history.annotate(position=Window(
+            expression=RowNumber(),
+            partition_by=[F('customer_id')],
+            order_by=F('changed_at').desc(),
+        ))
+        .filter(position__gt=keep_recent)
+    )
+
+
+def archivable_history(days=None, keep_recent=None):
+    """
+    History rows older than ``days`` that can leave the hot table.
+
+    The newest ``keep_recent`` of those rows per customer stay behind as a
+    recent summary, as do rows still referenced by a follow-up reminder
+    (deleting them would cascade to the reminder).
+    """
+    return _beyond_recent(_old_history(days), keep_recent)
+
+
+def archive_history(days=None, keep_recent=None, batch_size=1000, dry_run=False):
+    """
+    Move archivable history into ``CustomerStatusHistoryArchive`` for
+    ``batch_size`` customers at a time, copying and deleting each batch in
+    one transaction.
+
+    Batches walk the customer ids in order and rank only their own rows, so
+    every old row is ranked once instead of once per batch.
+    """
+    start = time.perf_counter()
+    if dry_run:
+        return ArchiveResult(archivable_history(days, keep_recent).count(), time.perf_counter() - start)
+
+    old = _old_history(days)
+    customers = old.order_by('customer_id').values_list('customer_id', flat=True).distinct()
+    archived = 0
+    last_customer = None
+    while True:
+        batch = customers if last_customer is None else customers.filter(customer_id__gt=last_customer)
+        customer_ids = list(batch[:batch_size])
+        if not customer_ids:
+            break
+        last_customer = customer_ids[-1]
+
+        with transaction.atomic():
+            rows = list(_beyond_recent(old.filter(customer_id__in=customer_ids), keep_recent).values(*ARCHIVE_FIELDS))
+            if rows:
+                now = timezone.now()
+                CustomerStatusHistoryArchive.objects.bulk_create(
+                    [CustomerStatusHistoryArchive(archived_at=now, **row) for row in rows],
+                    ignore_conflicts=True,
+                )
+                CustomerStatusHistory.objects.filter(id__in=[row['id'] for row in rows]).delete()
+                archived += len(rows)
+
+        if len(customer_ids) < batch_size:
+            break
+
+    return ArchiveResult(archived, time.perf_counter() - start)
+
+
+def has_archived_history(customer):
+    return CustomerStatusHistoryArchive.objects.filter(customer_id=customer.pk).exists()
+
+
+def archived_history(customer, offset=0, limit=50):
+    """
+    Return one page of a customer's archived history, newest first, as
+    JSON-ready dicts, plus whether more entries follow.
+    """
+    rows = list(
+        CustomerStatusHistoryArchive.objects.filter(customer_id=customer.pk)
+        .order_by('-changed_at')
+        .values(*ARCHIVE_FIELDS)[offset:offset + limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    labels = dict(CustomerStatus.choices)
+    users = User.objects.in_bulk({row['changed_by_id'] for row in rows if row['changed_by_id']})
+    entries = []
+    for row in rows:
+        user = users.get(row['changed_by_id'])
+        entries.append({
+            'id': str(row['id']),
+            'previous_status': row['previous_status'],
+            'previous_status_display': labels.get(row['previous_status'], row['previous_status']),
+            'new_status': row['new_status'],
+            'new_status_display': labels.get(row['new_status'], row['new_status']),
+            'changed_by': (user.get_full_name() or user.username) if user else None,
+            'changed_at': row['changed_at'].isoformat(),
+            'notes': row['notes'],
+        })
+    return entries, has_more
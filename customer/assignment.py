@@ -0,0 +1,330 @@
+import heapq
+import random
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .events import record_many
+from .facets import invalidate_facet_counts
+from .models import Customer, CustomerEvent, CustomerStatus, User
+
+RANDOM = 'random'
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+
+STRATEGY_CHOICES = [
+    (RANDOM, 'Random (balanced)'),
+    (ROUND_ROBIN, 'Round robin'),
+    (LEAST_LOADED, 'Least loaded first'),
+]
+
+# Customers in these statuses no longer count towards a counsellor's workload
+CLOSED_STATUSES = [CustomerStatus.INVALID, CustomerStatus.NOT_INTERESTED, CustomerStatus.ADMISSION]
+
+# How many candidate rows a random-assignment sample aims for, per row claimed
+SAMPLE_OVERSAMPLE = 3
+
+
+def current_loads(counsellor_ids):
+    """Return {counsellor_id: assigned customer count} using one aggregate query."""
+    loads = {counsellor_id: 0 for counsellor_id in counsellor_ids}
+    rows = (
+        Customer.objects.filter(assigned_to__in=counsellor_ids)
+        .order_by()
+        .values('assigned_to')
+        .annotate(count=Count('id'))
+    )
+    for row in rows:
+        loads[row['assigned_to']] = row['count']
+    return loads
+
+
+def build_assignment(customer_ids, counsellor_ids, strategy=RANDOM, loads=None, rng=None):
+    """
+    Map customers to counsellors in memory and return
+    {counsellor_id: [customer_id, ...]}.
+
+    ``random`` shuffles the customers and deals them out so every counsellor
+    gets within one of the same number; ``round_robin`` deals them in the
+    given order; ``least_loaded`` always hands the next customer to the
+    counsellor with the fewest customers, counting ``loads`` (existing
+    assignments) when given.
+    """
+    counsellor_ids = list(counsellor_ids)
+    customer_ids = list(customer_ids)
+    mapping = {counsellor_id: [] for counsellor_id in counsellor_ids}
+    if not counsellor_ids or not customer_ids:
+        return mapping
+
+    if strategy == LEAST_LOADED:
+        loads = loads or {}
+        heap = [(loads.get(counsellor_id, 0), position, counsellor_id)
+                for position, counsellor_id in enumerate(counsellor_ids)]
+        heapq.heapify(heap)
+        for customer_id in customer_ids:
+            load, position, counsellor_id = heapq.heappop(heap)
+            mapping[counsellor_id].append(customer_id)
+            heapq.heappush(heap, (load + 1, position, counsellor_id))
+        return mapping
+
+    if strategy == RANDOM:
+        rng = rng or random.Random()
+        rng.shuffle(customer_ids)
+        # Rotate the deal order so the remainder doesn't always land on the same people
+        offset = rng.randrange(len(counsellor_ids))
+        counsellor_ids = counsellor_ids[offset:] + counsellor_ids[:offset]
+    elif strategy != ROUND_ROBIN:
+        raise ValueError(f'Unknown assignment strategy: {strategy}')
+
+    for position, customer_id in enumerate(customer_ids):
+        mapping[counsellor_ids[position % len(counsellor_ids)]].append(customer_id)
+    return mapping
+
+
+def _claim(candidates, counsellor_id, actor=None, skip_locked=False):
+    """
+    Assign the customers selected by ``candidates`` (a possibly sliced
+    queryset) to a counsellor, log an assignment event per row whose
+    assignee changed, and return the number of rows updated.
+
+    On PostgreSQL this is a single ``UPDATE ... FROM (SELECT ... FOR UPDATE)
+    ... RETURNING``: the subquery locks the rows and carries each previous
+    assignee out with the new one. ``skip_locked`` passes over rows another
+    transaction holds instead of waiting for them. SQLite can't return
+    columns of a joined table, but it serializes writers, so reading the
+    rows first in the same transaction is just as exact.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            qn = connection.ops.quote_name
+            meta = Customer._meta
+            table = qn(meta.db_table)
+            pk = qn(meta.pk.column)
+            assigned_to = qn(meta.get_field('assigned_to').column)
+            version = qn(meta.get_field('version').column)
+            locked = candidates.select_for_update(skip_locked=skip_locked, of=('self',)).values('pk', 'assigned_to')
+            subquery, subquery_params = locked.query.sql_with_params()
+            sql = (
+                f'UPDATE {table} SET {assigned_to} = %s, '
+                f'{qn(meta.get_field("updated_at").column)} = %s, {version} = {table}.{version} + 1 '
+                f'FROM ({subquery}) AS claimed WHERE {table}.{pk} = claimed.{pk} '
+                f'RETURNING {table}.{pk}, claimed.{assigned_to}'
+            )
+            params = [counsellor_id, connection.ops.adapt_datetimefield_value(now), *subquery_params]
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        else:
+            rows = list(candidates.values_list('pk', 'assigned_to'))
+            Customer.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                assigned_to_id=counsellor_id, updated_at=now, version=F('version') + 1
+            )
+        record_many(
+            CustomerEvent.ASSIGNMENT,
+            [(pk, previous, counsellor_id) for pk, previous in rows if previous != counsellor_id],
+            actor=actor,
+        )
+    return len(rows)
+
+
+def apply_assignment(mapping, only_unassigned=False, actor=None):
+    """
+    Write ``mapping`` with one UPDATE per counsellor inside a single
+    transaction, logging an assignment event per updated row. Returns
+    {counsellor_id: rows updated}.
+    """
+    distribution = {}
+    with transaction.atomic():
+        for counsellor_id, customer_ids in mapping.items():
+            if not customer_ids:
+                distribution[counsellor_id] = 0
+                continue
+            queryset = Customer.objects.filter(id__in=customer_ids).order_by()
+            if only_unassigned:
+                queryset = queryset.filter(assigned_to__isnull=True)
+            distribution[counsellor_id] = _claim(queryset, counsellor_id, actor=actor)
+        transaction.on_commit(invalidate_facet_counts)
+    return distribution
+
+
+def claim_unassigned(counsellor_id, count, actor=None):
+    """
+    Assign up to ``count`` of the newest unassigned customers to a counsellor
+    in a single UPDATE and return how many rows were claimed.
+
+    On PostgreSQL the candidate rows are locked with FOR UPDATE SKIP LOCKED,
+    so managers claiming at the same time get disjoint sets instead of
+    overwriting each other. SQLite serializes writers, so the same claim
+    without the locking clause is already safe there.
+    """
+    candidates = Customer.objects.filter(assigned_to__isnull=True).order_by('-created_at')[:count]
+    with transaction.atomic():
+        claimed = _claim(candidates, counsellor_id, actor=actor, skip_locked=True)
+        if claimed:
+            transaction.on_commit(invalidate_facet_counts)
+    return claimed
+
+
+def _tablesample(queryset, percent):
+    """
+    Restrict ``queryset`` to the rows on a random ``percent`` of the customer
+    table's pages (PostgreSQL ``TABLESAMPLE SYSTEM``), so later ordering and
+    limiting only touch the sample instead of every matching row.
+    """
+    table = connection.ops.quote_name(Customer._meta.db_table)
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    sql = sql.replace(f'FROM {table}', f'FROM {table} TABLESAMPLE SYSTEM (%s)', 1)
+    return Customer.objects.filter(pk__in=RawSQL(sql, (percent, *params)))
+
+
+def sample_and_assign(queryset, counsellor_id, count, batch_size=5000, actor=None):
+    """
+    Assign ``count`` customers drawn at random from ``queryset`` to a
+    counsellor without loading them into Python.
+
+    Each batch claims up to ``batch_size`` rows picked with ``ORDER BY
+    random()`` in one UPDATE and logs each row's previous assignee. On
+    PostgreSQL the random order only covers a ``TABLESAMPLE SYSTEM`` sample
+    sized for SAMPLE_OVERSAMPLE times the batch, so a batch reads a fraction
+    of the table's pages instead of sorting every candidate; every row is
+    equally likely to be sampled, and a sample that comes back empty is
+    retried at twice the size, up to the whole table. Elsewhere each batch
+    orders every candidate. ``queryset`` must exclude rows already assigned
+    to the counsellor, so claimed rows drop out of later batches. Returns
+    the number of customers assigned.
+    """
+    sampled = connection.vendor == 'postgresql'
+    remaining = queryset.count() if sampled else None
+    oversample = SAMPLE_OVERSAMPLE
+    assigned = 0
+    while assigned < count:
+        take = min(batch_size, count - assigned)
+        candidates = queryset
+        if sampled:
+            percent = min(100.0, 100.0 * take * oversample / max(remaining, 1))
+            candidates = _tablesample(queryset, percent)
+        claimed = _claim(candidates.order_by('?')[:take], counsellor_id, actor=actor)
+        if not claimed:
+            if not sampled or percent >= 100:
+                break
+            oversample *= 2
+            continue
+        assigned += claimed
+        if sampled:
+            remaining -= claimed
+
+    if assigned:
+        transaction.on_commit(invalidate_facet_counts)
+    return assigned
+
+
+def assign_customers(customer_ids, counsellor_ids, strategy=RANDOM, only_unassigned=False, actor=None):
+    """Build and apply an assignment; returns the per-counsellor distribution."""
+    loads = current_loads(counsellor_ids) if strategy == LEAST_LOADED else None
+    mapping = build_assignment(customer_ids, counsellor_ids, strategy, loads=loads)
+    return apply_assignment(mapping, only_unassigned=only_unassigned, actor=actor)
+
+
+def open_workloads(counsellor_ids):
+    """Return {counsellor_id: open customer count} using one aggregate query."""
+    loads = {counsellor_id: 0 for counsellor_id in counsellor_ids}
+    rows = (
+        Customer.objects.filter(assigned_to__in=counsellor_ids)
+        .exclude(status__in=CLOSED_STATUSES)
+        .order_by()
+        .values('assigned_to')
+        .annotate(count=Count('id'))
+    )
+    for row in rows:
+        loads[row['assigned_to']] = row['count']
+    return loads
+
+
+class AutoAssignResult:
+    """Outcome of one auto-assignment run; ``skipped`` customers stay unassigned."""
+
+    def __init__(self, distribution, skipped, elapsed):
+        self.distribution = distribution
+        self.assigned = sum(distribution.values())
+        self.skipped = skipped
+        self.elapsed = elapsed
+
+    @property
+    def rate(self):
+        return self.assigned / self.elapsed if self.elapsed else 0.0
+
+
+def _capacity(counsellor, default_capacity):
+    return default_capacity if counsellor.capacity is None else counsellor.capacity
+
+
+def plan_auto_assignment(customers, counsellors, loads, default_capacity):
+    """
+    Hand each customer (dicts with ``id`` and ``area``) to the least-loaded
+    counsellor that still has capacity, preferring counsellors whose areas
+    match the customer's. Returns ({counsellor_id: [customer_id, ...]},
+    number of customers left over for lack of capacity).
+    """
+    remaining = {
+        counsellor.id: max(_capacity(counsellor, default_capacity) - loads.get(counsellor.id, 0), 0)
+        for counsellor in counsellors
+    }
+    loads = dict(loads)
+    areas = {counsellor.id: set(counsellor.area_list()) for counsellor in counsellors}
+    mapping = {counsellor.id: [] for counsellor in counsellors}
+    skipped = 0
+
+    # Place customers with a matching area first so affinity capacity isn't
+    # used up by leads anyone could take
+    covered = set().union(*areas.values())
+    customers = sorted(customers, key=lambda customer: (customer['area'] or '').strip().lower() not in covered)
+
+    for customer in customers:
+        available = [counsellor_id for counsellor_id, left in remaining.items() if left > 0]
+        if not available:
+            skipped += 1
+            continue
+        area = (customer['area'] or '').strip().lower()
+        preferred = [counsellor_id for counsellor_id in available if area and area in areas[counsellor_id]]
+        counsellor_id = min(preferred or available, key=lambda candidate: loads.get(candidate, 0))
+        mapping[counsellor_id].append(customer['id'])
+        remaining[counsellor_id] -= 1
+        loads[counsellor_id] = loads.get(counsellor_id, 0) + 1
+
+    return mapping, skipped
+
+
+def auto_assign(customers=None, limit=None):
+    """
+    Assign unassigned customers to active counsellors within their capacity.
+
+    Workloads come from one aggregate query and the result is written with
+    one UPDATE per counsellor; rows a manager assigned in the meantime are
+    left alone. ``customers`` optionally narrows the candidate queryset (e.g.
+    to the rows of one import).
+    """
+    start = time.perf_counter()
+    default_capacity = getattr(settings, 'AUTO_ASSIGN_DEFAULT_CAPACITY', 200)
+
+    counsellors = list(User.objects.filter(role=User.SALES, is_active=True).only('id', 'capacity', 'areas'))
+    if not counsellors:
+        return AutoAssignResult({}, 0, time.perf_counter() - start)
+
+    loads = open_workloads([counsellor.id for counsellor in counsellors])
+    free = sum(max(_capacity(counsellor, default_capacity) - loads[counsellor.id], 0) for counsellor in counsellors)
+
+    queryset = Customer.objects.all() if customers is None else customers
+    queryset = queryset.filter(assigned_to__isnull=True).order_by('created_at')
+    backlog = queryset.count()
+    take = min(free, limit) if limit is not None else free
+    candidates = list(queryset.values('id', 'area')[:take])
+
+    mapping, skipped = plan_auto_assignment(candidates, counsellors, loads, default_capacity)
+    distribution = apply_assignment(mapping, only_unassigned=True)
+
+    return AutoAssignResult(distribution, skipped + backlog - len(candidates), time.perf_counter() - start)
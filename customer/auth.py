@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+
+
+def user_cache_key(user_id):
+    return f'customer:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance, **kwargs):
+    # Drop the entry now and again after commit, so a request that reads the
+    # old row before the commit can't put it back for the full timeout
+    invalidate_cached_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that serves the per-request user lookup from the cache.
+
+    Users are cached by id for ``AUTH_USER_CACHE_TIMEOUT`` seconds and
+    dropped whenever they are saved or deleted, which includes password
+    changes. The cached row carries the password hash, so sessions are still
+    invalidated by a password change. Only used with a shared cache
+    (``SHARED_CACHE``): a per-process cache would keep serving a deactivated
+    user or old password hash in every other worker, so without one each
+    lookup goes to the database.
+    """
+
+    def get_user(self, user_id):
+        if not getattr(settings, 'SHARED_CACHE', False):
+            return super().get_user(user_id)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300))
+            return user
+        return user if self.user_can_authenticate(user) else None
+
@@ -0,0 +1,97 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+from django.db.models import Count, Q
+
+from .models import Customer, CustomerStatus, FileImport
+
+# Threads for concurrent dashboard aggregates, shared by every request in the
+# process; 0 runs the aggregates one after another on the request's thread.
+# Threads are only started on first use, so none exist yet when gunicorn forks.
+_threads = getattr(settings, 'DASHBOARD_QUERY_THREADS', 4)
+_executor = ThreadPoolExecutor(max_workers=_threads, thread_name_prefix='dashboard-aggregates') if _threads else None
+
+
+def customer_totals():
+    """Return (total, assigned, unassigned) customer counts from one query."""
+    totals = Customer.objects.aggregate(
+        total=Count('id'),
+        assigned=Count('id', filter=Q(assigned_to__isnull=False)),
+    )
+    return totals['total'], totals['assigned'], totals['total'] - totals['assigned']
+
+
+def status_distribution(queryset=None):
+    """Return {status: count} for every ``CustomerStatus``, including empty ones."""
+    if queryset is None:
+        queryset = Customer.objects.all()
+    counts = dict(
+        queryset.filter(status__isnull=False).order_by().values_list('status').annotate(count=Count('id'))
+    )
+    return {status: counts.get(status, 0) for status in CustomerStatus.values}
+
+
+def counsellor_status_counts():
+    """
+    Return {counsellor_id: {status: count}} for every assigned customer from
+    one GROUP BY. Customers without a status are counted under ``None``.
+    """
+    counts = {}
+    rows = (
+        Customer.objects.filter(assigned_to__isnull=False)
+        .order_by()
+        .values_list('assigned_to_id', 'status')
+        .annotate(count=Count('id'))
+    )
+    for counsellor_id, status, count in rows:
+        counts.setdefault(counsellor_id, {})[status] = count
+    return counts
+
+
+def recent_imports(limit=5):
+    return list(FileImport.objects.all()[:limit])
+
+
+def _on_worker(wrappers, aggregate):
+    # Pool threads keep one persistent connection each and, like request
+    # threads, only drop it once it is broken or older than CONN_MAX_AGE
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            for alias, alias_wrappers in wrappers.items():
+                for wrapper in alias_wrappers:
+                    stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            return aggregate()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(*aggregates):
+    """
+    Run the zero-argument callables in ``aggregates`` at the same time and
+    return their results in order.
+
+    The first runs on the calling thread; the rest run on the shared thread
+    pool, each thread on its own persistent connection, with the caller's
+    context (e.g. ``@read_replica``) and execute wrappers (statement
+    timeouts, instrumentation) carried over. Pool connections can't see rows
+    the caller hasn't committed, so inside a transaction (e.g. in tests), or
+    with ``DASHBOARD_QUERY_THREADS=0``, the aggregates run one after another
+    on the caller's connection instead.
+    """
+    if _executor is None or connection.in_atomic_block:
+        return [aggregate() for aggregate in aggregates]
+
+    wrappers = {
+        caller_connection.alias: list(caller_connection.execute_wrappers)
+        for caller_connection in connections.all()
+        if caller_connection.execute_wrappers
+    }
+    first, *rest = aggregates
+    futures = [
+        _executor.submit(contextvars.copy_context().run, _on_worker, wrappers, aggregate) for aggregate in rest
+    ]
+    return [first(), *(future.result() for future in futures)]
@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import CustomerEvent
+
+# Events committed during the current request (or ``tracked()`` block)
+_committed = ContextVar('customer_event_commits', default=None)
+
+# Reads the oldest transaction still running when the query's snapshot was taken
+SNAPSHOT_XMIN_SQL = 'txid_snapshot_xmin(txid_current_snapshot())'
+
+
+def _write(events):
+    with transaction.atomic():
+        transaction_id = 0
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT txid_current()')
+                transaction_id = cursor.fetchone()[0]
+        for event in events:
+            event.transaction_id = transaction_id
+        CustomerEvent.objects.bulk_create(events)
+
+
+@contextmanager
+def tracked():
+    """
+    Yield a list that collects the events committed inside the block. Nested
+    blocks share the outer list.
+    """
+    if _committed.get() is not None:
+        yield _committed.get()
+        return
+
+    committed = []
+    token = _committed.set(committed)
+    try:
+        yield committed
+    finally:
+        _committed.reset(token)
+
+
+def record_many(event_type, changes, actor=None):
+    """
+    Log one event per ``(customer_id, old_value, new_value)`` in ``changes``
+    with a single multi-row INSERT.
+
+    Call this inside the transaction that makes the changes: the events
+    commit or roll back with them, so the log never misses a committed change
+    or shows one that didn't happen.
+    """
+    actor_id = getattr(actor, 'pk', actor)
+    events = [
+        CustomerEvent(
+            customer_id=customer_id,
+            event_type=event_type,
+            old_value=None if old_value is None else str(old_value),
+            new_value=None if new_value is None else str(new_value),
+            actor_id=actor_id,
+        )
+        for customer_id, old_value, new_value in changes
+    ]
+    if not events:
+        return
+
+    _write(events)
+    committed = _committed.get()
+    if committed is not None:
+        transaction.on_commit(lambda: committed.extend(events))
+
+
+def record(event_type, customer_id, old_value, new_value, actor=None):
+    """Log a single event; see ``record_many``."""
+    record_many(event_type, [(customer_id, old_value, new_value)], actor=actor)
+
+
+def events_after(last_id, limit=1000):
+    """
+    Return up to ``limit`` events committed after the event ``last_id`` (0
+    for the start of the log), in commit order. Consumers store the id of
+    the last event they handled and pass it back on the next call.
+
+    Ids are handed out on insert, before commit, so a long transaction can
+    commit an id below one a consumer already read. On PostgreSQL events are
+    therefore ordered by the id of the transaction that wrote them and only
+    returned once every transaction that started before them has finished;
+    any later commit has a higher transaction id, so nothing is skipped. A
+    long-running write transaction holds back the events committed after it
+    started until it ends. SQLite serializes writers, so ids already commit
+    in order there.
+    """
+    events = CustomerEvent.objects.order_by('transaction_id', 'id')
+    if last_id:
+        last_transaction = (
+            CustomerEvent.objects.filter(pk=last_id).values_list('transaction_id', flat=True).first() or 0
+        )
+        events = events.filter(
+            Q(transaction_id__gt=last_transaction) | Q(transaction_id=last_transaction, id__gt=last_id)
+        )
+    if connection.vendor == 'postgresql':
+        events = events.filter(transaction_id__lt=RawSQL(SNAPSHOT_XMIN_SQL, ()))
+    return list(events[:limit])
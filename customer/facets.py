@@ -0,0 +1,161 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Customer, CustomerStatus, User
+from .roster import get_roster
+
+FACET_FIELDS = ('status', 'assigned_to_id', 'area')
+GENERATION_KEY = 'customer:facets:generation'
+
+
+def normalize_search(search):
+    """
+    Canonical form of a customer_list search: surrounding and repeated
+    whitespace collapsed, lowercased (the search is case-insensitive).
+    Callers filter with this value so it always matches the cache key.
+    """
+    return ' '.join((search or '').split()).lower()
+
+
+def normalize_filter(user, status=None, search=None):
+    """
+    Reduce the customer_list filter to a canonical tuple so that equivalent
+    requests ("all" vs. empty status, padded or differently cased search)
+    share one cache entry.
+    """
+    scope = 'all' if user.is_manager() else f'user:{user.pk}'
+    if not status or status == 'all':
+        status = ''
+    return (scope, status, normalize_search(search))
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, int(time.time() * 1000), None)
+
+
+def invalidate_facet_counts():
+    """
+    Drop every cached facet result by moving the shared generation key.
+    Call this after the write has committed (``transaction.on_commit``),
+    including bulk writes that bypass model signals (QuerySet.update,
+    bulk_create, bulk_update). With a per-process cache other workers keep
+    their entries until FACET_CACHE_TIMEOUT expires them.
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, int(time.time() * 1000), None)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def _customer_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_facet_counts)
+
+
+def _facet_sql(queryset):
+    """
+    Build one SQL statement returning (facet, value, count) rows for every
+    facet field over the filtered queryset.
+    """
+    inner = queryset.order_by().values(*FACET_FIELDS)
+    sql, params = inner.query.sql_with_params()
+    qn = connection.ops.quote_name
+    columns = [qn(field) for field in FACET_FIELDS]
+
+    if connection.vendor == 'postgresql':
+        grouping = ', '.join(f'GROUPING({column})' for column in columns)
+        sets = ', '.join(f'({column})' for column in columns)
+        return (
+            f'SELECT {", ".join(columns)}, {grouping}, COUNT(*) '
+            f'FROM ({sql}) AS facet_source GROUP BY GROUPING SETS ({sets})'
+        ), params
+
+    # SQLite (and anything without GROUPING SETS): one CTE, one UNION ALL
+    selects = ' UNION ALL '.join(
+        f"SELECT '{field}', CAST({column} AS TEXT), COUNT(*) FROM facet_source GROUP BY {column}"
+        for field, column in zip(FACET_FIELDS, columns)
+    )
+    return f'WITH facet_source AS ({sql}) {selects}', params
+
+
+def _fetch_counts(queryset):
+    sql, params = _facet_sql(queryset)
+    counts = {field: {} for field in FACET_FIELDS}
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    if connection.vendor == 'postgresql':
+        width = len(FACET_FIELDS)
+        for row in rows:
+            values, grouping, count = row[:width], row[width:2 * width], row[-1]
+            # GROUPING(col) is 0 for the column the row was grouped by
+            field = FACET_FIELDS[list(grouping).index(0)]
+            counts[field][values[FACET_FIELDS.index(field)]] = count
+    else:
+        for field, value, count in rows:
+            if field == 'assigned_to_id' and value is not None:
+                value = int(value)
+            counts[field][value] = count
+
+    return counts
+
+
+def _build_facet(counts, label_for):
+    """Merge NULL and empty values into one bucket and sort by count."""
+    merged = {}
+    for value, count in counts.items():
+        value = value or ''
+        merged[value] = merged.get(value, 0) + count
+    items = [
+        {'value': value, 'label': label_for(value), 'count': count}
+        for value, count in merged.items()
+    ]
+    return sorted(items, key=lambda item: -item['count'])
+
+
+def get_facet_counts(queryset, user, status=None, search=None):
+    """
+    Return status, counsellor and area counts for the filtered customer
+    queryset, computed in a single grouped query and cached per normalized
+    filter. ``search`` must be the value the queryset was filtered with
+    (see ``normalize_search``). A cache hit costs two cache reads and no
+    query.
+    """
+    normalized = normalize_filter(user, status, search)
+    digest = hashlib.md5(repr(normalized).encode()).hexdigest()
+    cache_key = f'customer:facets:{_generation()}:{digest}'
+
+    facets = cache.get(cache_key)
+    if facets is not None:
+        return facets
+
+    counts = _fetch_counts(queryset)
+    status_labels = dict(CustomerStatus.choices)
+    area_limit = getattr(settings, 'FACET_AREA_LIMIT', 10)
+
+    roster = get_roster()
+    names = {pk: counsellor.display_name for pk, counsellor in roster.items()}
+    # Customers can still point at users who are no longer counsellors
+    others = [pk for pk in counts['assigned_to_id'] if pk is not None and pk not in roster]
+    if others:
+        names.update(
+            (user.pk, user.get_full_name() or user.username)
+            for user in User.objects.filter(pk__in=others).only('username', 'first_name', 'last_name')
+        )
+
+    facets = {
+        'status': _build_facet(counts['status'], lambda value: status_labels.get(value, 'No Status')),
+        'counsellor': _build_facet(counts['assigned_to_id'], lambda value: names.get(value, 'Unassigned')),
+        'area': _build_facet(counts['area'], lambda value: value or 'No Area')[:area_limit],
+    }
+    cache.set(cache_key, facets, getattr(settings, 'FACET_CACHE_TIMEOUT', 60))
+    return facets
@@ -38,10 +38,12 @@ class CustomerStatusForm(forms.Form):
             'min': timezone.now().date().isoformat(),
         })
     )
+    # Customer version the client last saw; a mismatch is reported as a conflict
+    version = forms.IntegerField(required=False, min_value=0, widget=forms.HiddenInput())
 
 class CustomerAssignForm(forms.Form):
     assigned_to = forms.ModelChoiceField(
-        queryset=User.objects.filter(role=User.SALES),
+        queryset=User.objects.filter(role=User.SALES, is_active=True),
         empty_label="Unassigned",
         required=False,
         widget=forms.Select(attrs={'class': 'shadow-sm focus:ring-indigo-500 focus:border-indigo-500 block w-full sm:text-sm border-gray-300 rounded-md'})
@@ -1,60 +1,164 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
 from django.http import JsonResponse
-from django.db import connections
-from django.db.utils import OperationalError
+from django.utils import timezone
 from django.views.decorators.cache import never_cache
-from django.conf import settings
-import time
-import os
 
-@never_cache
-def health_check(request):
-    """
-    Health check endpoint for monitoring and load balancers.
-    Checks:
-    1. Database connection
-    2. Static files
-    3. Media files
-    4. Environment variables
-    """
-    start_time = time.time()
-    
-    # Check database connection
-    db_conn = True
+from .models import FileImport
+
+_deep_lock = threading.Lock()
+_deep_result = None
+_deep_checked_at = 0.0
+
+
+def _milliseconds(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def check_database(alias='default'):
+    """
+    Run ``SELECT 1`` on ``alias`` and time it, including connecting if the
+    worker had no open connection. On PostgreSQL the query is cancelled
+    after HEALTH_DB_DEADLINE_MS; elsewhere a slower answer fails the check.
+    """
+    deadline_ms = settings.HEALTH_DB_DEADLINE_MS
+    connection = connections[alias]
+    reused = connection.connection is not None
+    start = time.perf_counter()
+    postgresql = connection.vendor == 'postgresql'
     try:
-        db_conn = connections['default'].cursor()
-    except OperationalError:
-        db_conn = False
-    
-    # Check static files directory
-    static_files = os.path.exists(settings.STATIC_ROOT)
-    
-    # Check media files directory
-    media_files = os.path.exists(settings.MEDIA_ROOT)
-    
-    # Check environment variables
-    env_vars = {
-        'DEBUG': settings.DEBUG,
-        'ALLOWED_HOSTS': settings.ALLOWED_HOSTS,
-        'DATABASE_URL': bool(os.getenv('DATABASE_URL')),
-        'COMPANY_NAME': bool(settings.COMPANY_NAME),
+        # SET LOCAL only lasts until the end of the transaction
+        with transaction.atomic(using=alias) if postgresql else nullcontext(), connection.cursor() as cursor:
+            if postgresql:
+                cursor.execute('SET LOCAL statement_timeout = %s', [deadline_ms])
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError:
+        return {'status': 'error', 'connection': 'reused' if reused else 'new', 'latency_ms': _milliseconds(start)}
+
+    latency_ms = _milliseconds(start)
+    return {
+        'status': 'ok' if latency_ms <= deadline_ms else 'slow',
+        'connection': 'reused' if reused else 'new',
+        'latency_ms': latency_ms,
     }
-    
-    # Overall status
-    status = 'healthy' if db_conn and static_files and media_files else 'unhealthy'
-    
-    # Response time
-    response_time = time.time() - start_time
-    
-    response = {
-        'status': status,
-        'response_time': f"{response_time:.4f}s",
-        'database': 'connected' if db_conn else 'disconnected',
-        'static_files': 'available' if static_files else 'unavailable',
-        'media_files': 'available' if media_files else 'unavailable',
-        'environment': env_vars,
-        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+
+
+def check_migrations(alias='default'):
+    """Number of migrations on disk not yet applied to ``alias``."""
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return {'status': 'ok' if not plan else 'pending', 'pending': len(plan)}
+
+
+def check_storage():
+    """Write and delete a small file in media storage."""
+    try:
+        name = default_storage.save(f'health/{os.getpid()}.check', ContentFile(b'ok'))
+        default_storage.delete(name)
+    except OSError:
+        return {'status': 'error'}
+    return {'status': 'ok'}
+
+
+def check_imports():
+    """
+    Imports that were started but never finished. An import sets
+    ``completed_at`` when it is done, so one still without it after
+    HEALTH_IMPORT_STALL_SECONDS was cut off (e.g. its worker was killed).
+    """
+    unfinished = FileImport.objects.filter(completed_at__isnull=True)
+    stalled_before = timezone.now() - timedelta(seconds=settings.HEALTH_IMPORT_STALL_SECONDS)
+    stalled = unfinished.filter(imported_at__lt=stalled_before).count()
+    return {
+        'status': 'ok' if not stalled else 'stalled',
+        'unfinished': unfinished.count(),
+        'stalled': stalled,
     }
-    
-    status_code = 200 if status == 'healthy' else 503
-    
-    return JsonResponse(response, status=status_code)
+
+
+def deep_checks():
+    """
+    Run the expensive checks at most once per HEALTH_DEEP_CHECK_INTERVAL
+    seconds in each worker. While one thread runs them, others get the
+    previous result instead of waiting, so a burst of probes costs at most
+    one round of queries.
+    """
+    global _deep_result, _deep_checked_at
+
+    interval = settings.HEALTH_DEEP_CHECK_INTERVAL
+    if _deep_result is not None and time.monotonic() - _deep_checked_at < interval:
+        return _deep_result
+    if not _deep_lock.acquire(blocking=_deep_result is None):
+        return _deep_result
+
+    try:
+        if _deep_result is None or time.monotonic() - _deep_checked_at >= interval:
+            start = time.perf_counter()
+            checks = {}
+            for name, check in (('migrations', check_migrations), ('storage', check_storage), ('imports', check_imports)):
+                try:
+                    checks[name] = check()
+                except DatabaseError:
+                    checks[name] = {'status': 'error'}
+            _deep_result = {
+                'checks': checks,
+                'duration_ms': _milliseconds(start),
+                'checked_at': timezone.now().isoformat(),
+            }
+            _deep_checked_at = time.monotonic()
+        return _deep_result
+    finally:
+        _deep_lock.release()
+
+
+@never_cache
+def live(request):
+    """Liveness: the worker is up and serving requests. Touches nothing else."""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+def ready(request):
+    """Readiness: the worker can reach the database within the deadline."""
+    database = check_database()
+    healthy = database['status'] == 'ok'
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'unavailable', 'database': database},
+        status=200 if healthy else 503,
+    )
+
+
+@never_cache
+def deep(request):
+    """
+    Readiness plus cached checks of migrations, media storage and the
+    import backlog. Stalled imports are reported without failing the probe.
+    """
+    database = check_database()
+    result = deep_checks()
+    checks = result['checks']
+
+    healthy = database['status'] == 'ok' and all(
+        checks[name]['status'] == 'ok' for name in ('migrations', 'storage')
+    )
+    if not healthy:
+        status = 'unavailable'
+    elif checks['imports']['status'] != 'ok':
+        status = 'degraded'
+    else:
+        status = 'ok'
+
+    return JsonResponse(
+        {'status': status, 'database': database, **result},
+        status=200 if healthy else 503,
+    )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from customer.archive import archive_history
+
+class Command(BaseCommand):
+    help = 'Moves status history older than the archive horizon off the hot table, keeping a recent summary per customer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Archive history older than DAYS days (defaults to HISTORY_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--keep', type=int, default=None, help='Old entries kept per customer (defaults to HISTORY_KEEP_RECENT)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Customers whose history is moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        result = archive_history(
+            days=options['days'],
+            keep_recent=options['keep'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{result.archived} history entries would be archived')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Archived {result.archived} history entries in {result.elapsed:.2f}s'))
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
-from django.db.models import Q
+from customer.assignment import sample_and_assign
 from customer.models import User, Customer
-import random
+import time
 
 class Command(BaseCommand):
     help = 'Assigns a random number of unassigned customers to a specified sales person'
@@ -10,6 +10,7 @@ class Command(BaseCommand):
         parser.add_argument('username', type=str, help='Username of the sales person')
         parser.add_argument('count', type=int, help='Number of customers to assign')
         parser.add_argument('--force', action='store_true', help='Assign customers even if they are already assigned')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of customers updated per statement')
     
     def handle(self, *args, **options):
         username = options['username']
@@ -37,15 +38,12 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f'Only {available_count} customers available. Adjusting count.'))
                 count = available_count
             
-            # Randomly select customers
-            selected_customers = random.sample(list(available_customers), count)
+            # Sample and assign inside the database, one batch per statement
+            start = time.perf_counter()
+            assigned = sample_and_assign(available_customers, sales_user.id, count, batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - start
             
-            # Assign customers
-            for customer in selected_customers:
-                customer.assigned_to = sales_user
-                customer.save()
-            
-            self.stdout.write(self.style.SUCCESS(f'Successfully assigned {count} customers to {username}'))
+            self.stdout.write(self.style.SUCCESS(f'Successfully assigned {assigned} customers to {username} in {elapsed:.2f}s'))
             
         except User.DoesNotExist:
             self.stdout.write(self.style.ERROR(f'Sales user with username {username} does not exist'))
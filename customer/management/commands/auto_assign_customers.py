@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from customer.assignment import auto_assign
+from customer.models import User
+import time
+
+class Command(BaseCommand):
+    help = 'Assigns unassigned customers to student counsellors based on open workload, capacity and area'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of customers to assign per run')
+        parser.add_argument('--interval', type=int, default=0, help='Keep running, repeating every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            result = auto_assign(limit=options['limit'])
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Assigned {result.assigned} customers in {result.elapsed:.2f}s ({result.rate:.0f} leads/sec), '
+                f'{result.skipped} left unassigned'
+            ))
+            counsellors = User.objects.in_bulk([user_id for user_id, count in result.distribution.items() if count])
+            for user_id, user in counsellors.items():
+                self.stdout.write(f'  {user.username}: {result.distribution[user_id]}')
+
+            if not interval:
+                break
+
+            # Don't hold a connection open while sleeping
+            close_old_connections()
+            time.sleep(interval)
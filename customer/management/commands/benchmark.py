@@ -0,0 +1,270 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, DatabaseError
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from customer import dashboards
+from customer.admin import CustomerAdmin, CustomerStatusHistoryAdmin
+from customer.models import User, Customer, CustomerStatus, CustomerStatusHistory
+from customer.templatetags.customer_tags import status_badge, status_icon
+from customer.services import transition_status, StatusConflict
+import random
+import statistics
+import threading
+import time
+import uuid
+from unittest import mock
+
+BENCH_PREFIX = 'bench-'
+BENCH_PASSWORD = 'bench-password'
+
+# Session and user loading setups compared by the ``requests`` scenario
+AUTH_SETUPS = [
+    ('database', {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    }),
+    ('cached', {
+        'SESSION_ENGINE': 'core.sessions',
+        'AUTHENTICATION_BACKENDS': ['customer.auth.CachedModelBackend'],
+    }),
+]
+
+
+class Command(BaseCommand):
+    help = 'Runs a performance benchmark against the configured database using throwaway records'
+
+    scenarios = ['transitions', 'requests', 'badges', 'dashboards', 'middleware']
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=self.scenarios, help='Benchmark to run')
+        parser.add_argument('--clients', type=int, default=8, help='Number of concurrent clients')
+        parser.add_argument('--iterations', type=int, default=100, help='Operations per client')
+        parser.add_argument('--customers', type=int, default=50, help='Number of throwaway customers to create')
+
+    def handle(self, *args, **options):
+        if Customer.objects.filter(phone_number__startswith=BENCH_PREFIX).exists():
+            raise CommandError(f'Leftover {BENCH_PREFIX}* customers found; delete them before benchmarking')
+
+        sales_user = self.create_user(User.SALES)
+        customers = Customer.objects.bulk_create([
+            Customer(phone_number=f'{BENCH_PREFIX}{i}', name=f'Benchmark {i}', assigned_to=sales_user)
+            for i in range(options['customers'])
+        ])
+
+        try:
+            getattr(self, f'bench_{options["scenario"]}')(sales_user, options)
+        finally:
+            # Only what this run created
+            Customer.objects.filter(id__in=[customer.pk for customer in customers]).delete()
+            sales_user.delete()
+
+    def create_user(self, role):
+        """A throwaway user with a name no real account has; the caller deletes it."""
+        return User.objects.create_user(f'bench_{role}_{uuid.uuid4().hex[:12]}', password=BENCH_PASSWORD, role=role)
+
+    def run_clients(self, clients, work):
+        """
+        Run ``work(client_index, stats)`` in ``clients`` threads, each with its
+        own database connection, and return the collected stats and wall time.
+        """
+        stats = [{'latencies': [], 'ok': 0, 'conflicts': 0, 'errors': 0} for _ in range(clients)]
+
+        def target(index):
+            try:
+                work(index, stats[index])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats, time.perf_counter() - start
+
+    def bench_host(self):
+        return next((host for host in settings.ALLOWED_HOSTS if host and host != '*' and not host.startswith('.')), 'localhost')
+
+    def record(self, stats, response, start):
+        stats['latencies'].append(time.perf_counter() - start)
+        if response.status_code == 200:
+            stats['ok'] += 1
+        elif response.status_code == 409:
+            stats['conflicts'] += 1
+        else:
+            stats['errors'] += 1
+
+    def report(self, label, stats, elapsed):
+        latencies = sorted(latency for client in stats for latency in client['latencies'])
+        ok = sum(client['ok'] for client in stats)
+        conflicts = sum(client['conflicts'] for client in stats)
+        errors = sum(client['errors'] for client in stats)
+
+        self.stdout.write(self.style.SUCCESS(f'{label}: {ok} ok, {conflicts} conflicts, {errors} errors in {elapsed:.2f}s'))
+        self.stdout.write(f'  throughput: {ok / elapsed:.1f} ops/s')
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(f'  latency: p50 {statistics.median(latencies) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms')
+
+    def bench_transitions(self, sales_user, options):
+        """Concurrent clients moving random customers through random statuses."""
+        customer_ids = list(
+            Customer.objects.filter(phone_number__startswith=BENCH_PREFIX).values_list('id', flat=True)
+        )
+        statuses = [status for status in CustomerStatus.values if status != CustomerStatus.FOLLOW_UP]
+
+        def work(index, stats):
+            rng = random.Random(index)
+            for _ in range(options['iterations']):
+                start = time.perf_counter()
+                try:
+                    customer = Customer.objects.get(id=rng.choice(customer_ids))
+                    transition_status(sales_user, customer, rng.choice(statuses), notes='benchmark')
+                    stats['ok'] += 1
+                except StatusConflict:
+                    stats['conflicts'] += 1
+                except DatabaseError:
+                    stats['errors'] += 1
+                stats['latencies'].append(time.perf_counter() - start)
+
+        stats, elapsed = self.run_clients(options['clients'], work)
+        self.report(f'transitions ({options["clients"]} clients)', stats, elapsed)
+
+    def bench_requests(self, sales_user, options):
+        """
+        Authenticated page loads and status updates through the full
+        middleware stack, once with database sessions and user loading and
+        once with the cache-first setup, reporting queries per request.
+        """
+        customer_ids = list(
+            Customer.objects.filter(phone_number__startswith=BENCH_PREFIX).values_list('id', flat=True)
+        )
+        host = self.bench_host()
+        statuses = [status for status in CustomerStatus.values if status != CustomerStatus.FOLLOW_UP]
+
+        for label, overrides in AUTH_SETUPS:
+            with override_settings(**overrides):
+                client = Client(HTTP_HOST=host)
+                client.login(username=sales_user.username, password=BENCH_PASSWORD)
+                rng = random.Random(0)
+                stats = {'latencies': [], 'ok': 0, 'conflicts': 0, 'errors': 0}
+                queries = 0
+
+                start = time.perf_counter()
+                for i in range(options['iterations']):
+                    customer_id = rng.choice(customer_ids)
+                    request_start = time.perf_counter()
+                    with CaptureQueriesContext(connection) as context:
+                        if i % 2:
+                            response = client.post(
+                                reverse('update_customer_status', args=[customer_id]),
+                                {'status': rng.choice(statuses)},
+                                secure=True,
+                                HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+                            )
+                        else:
+                            response = client.get(reverse('customer_detail', args=[customer_id]), secure=True)
+                    self.record(stats, response, request_start)
+                    queries += len(context.captured_queries)
+
+                self.report(f'requests ({label} sessions and users)', [stats], time.perf_counter() - start)
+                self.stdout.write(f'  queries: {queries / options["iterations"]:.2f} per request')
+
+    def bench_badges(self, sales_user, options):
+        """Per-call cost of the status badge and icon helpers used by templates and the admin."""
+        statuses = CustomerStatus.values + ['']
+        customer_admin = CustomerAdmin(Customer, admin.site)
+        history_admin = CustomerStatusHistoryAdmin(CustomerStatusHistory, admin.site)
+        customers = [Customer(status=status) for status in statuses]
+        history = [
+            CustomerStatusHistory(previous_status=statuses[i - 1], new_status=status)
+            for i, status in enumerate(statuses)
+        ]
+        calls = options['iterations'] * 100
+
+        for label, render, items in [
+            ('status_badge filter', status_badge, statuses),
+            ('status_icon tag', status_icon, statuses),
+            ('admin status_badge', customer_admin.status_badge, customers),
+            ('admin status_change', history_admin.status_change, history),
+        ]:
+            start = time.perf_counter()
+            for i in range(calls):
+                render(items[i % len(items)])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f'{label}: {elapsed / calls * 1e6:.2f}us per call'))
+
+    def bench_dashboards(self, sales_user, options):
+        """
+        Manager dashboard and status page loads from concurrent clients, once
+        with the aggregates run one after another and once with them spread
+        over the dashboard thread pool.
+        """
+        manager = self.create_user(User.MANAGER)
+        paths = [reverse('dashboard'), reverse('customer_status')]
+        clients = options['clients']
+        iterations = options['iterations']
+
+        def work(index, stats):
+            client = Client()
+            client.force_login(manager)
+            for i in range(iterations):
+                start = time.perf_counter()
+                response = client.get(paths[i % len(paths)], secure=True)
+                self.record(stats, response, start)
+
+        try:
+            with mock.patch.object(dashboards, '_executor', None):
+                stats, elapsed = self.run_clients(clients, work)
+            self.report(f'Sequential aggregates ({clients} clients)', stats, elapsed)
+
+            stats, elapsed = self.run_clients(clients, work)
+            self.report(f'Concurrent aggregates ({clients} clients)', stats, elapsed)
+        finally:
+            manager.delete()
+
+    def bench_middleware(self, sales_user, options):
+        """
+        Per-request overhead of the site middleware alone, of the performance
+        instrumentation and of the whole configured stack around a trivial
+        view, for a page and a static path.
+        """
+        def view(request):
+            return HttpResponse('ok')
+
+        factory = RequestFactory(HTTP_HOST=self.bench_host())
+        requests = [
+            ('page', factory.get(reverse('customer_list'))),
+            ('static', factory.get(f'{settings.STATIC_URL}css/app.css')),
+        ]
+        calls = options['iterations'] * 100
+
+        for stack_label, middleware in [
+            ('site middleware', ['core.middleware.SiteMiddleware']),
+            ('performance instrumentation', ['core.middleware.PerformanceMiddleware']),
+            ('full stack', settings.MIDDLEWARE),
+        ]:
+            handler = view
+            with override_settings(PERFORMANCE_INSTRUMENTATION=True):
+                for path in reversed(middleware):
+                    handler = import_string(path)(handler)
+
+            for request_label, request in requests:
+                start = time.perf_counter()
+                for _ in range(calls):
+                    view(request)
+                baseline = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(calls):
+                    handler(request)
+                overhead = time.perf_counter() - start - baseline
+                self.stdout.write(self.style.SUCCESS(
+                    f'{stack_label}, {request_label}: {overhead / calls * 1e6:.2f}us per request'
+                ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from customer.reminders import dispatch
+import time
+
+class Command(BaseCommand):
+    help = 'Rolls over or escalates overdue follow-up reminders and refreshes the per-counsellor due/overdue counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Reminders processed per transaction')
+        parser.add_argument('--max-rollovers', type=int, default=None, help='Rollovers before an overdue reminder is escalated (defaults to FOLLOW_UP_MAX_ROLLOVERS)')
+        parser.add_argument('--interval', type=int, default=0, help='Keep running, repeating every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            result = dispatch(batch_size=options['batch_size'], max_rollovers=options['max_rollovers'])
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Rolled over {result.rolled_over} and escalated {result.escalated} overdue reminders '
+                f'in {result.elapsed:.2f}s; {result.due} due, {result.overdue} overdue'
+            ))
+
+            if not interval:
+                break
+
+            # Don't hold a connection open while sleeping
+            close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from customer.events import events_after
+import json
+import time
+
+class Command(BaseCommand):
+    help = 'Prints customer change events committed after a given event as JSON lines, optionally following new ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, default=0, help='Id of the last event already handled; only events committed after it are printed')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events fetched per query')
+        parser.add_argument('--follow', type=int, default=0, help='Keep polling every FOLLOW seconds')
+
+    def handle(self, *args, **options):
+        last_id = options['after']
+
+        while True:
+            batch = events_after(last_id, limit=options['batch_size'])
+            for event in batch:
+                self.stdout.write(json.dumps({
+                    'id': event.id,
+                    'customer_id': str(event.customer_id),
+                    'event_type': event.event_type,
+                    'old_value': event.old_value,
+                    'new_value': event.new_value,
+                    'actor_id': event.actor_id,
+                    'created_at': event.created_at.isoformat(),
+                }))
+                last_id = event.id
+
+            if len(batch) == options['batch_size']:
+                continue
+            if not options['follow']:
+                break
+
+            close_old_connections()
+            time.sleep(options['follow'])
+
+        self.stderr.write(f'Last event id: {last_id}')
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0011_customer_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='areas',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0012_user_capacity_areas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('customer_id', models.UUIDField(db_index=True)),
+                ('event_type', models.CharField(choices=[('status', 'Status change'), ('assignment', 'Assignment change'), ('import', 'Import upsert')], max_length=20)),
+                ('old_value', models.CharField(blank=True, max_length=255, null=True)),
+                ('new_value', models.CharField(blank=True, max_length=255, null=True)),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
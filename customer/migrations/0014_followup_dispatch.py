@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0013_customerevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowUpSummary',
+            fields=[
+                ('counselor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_up_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('due_count', models.PositiveIntegerField(default=0)),
+                ('overdue_count', models.PositiveIntegerField(default=0)),
+                ('escalated_count', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='followupreminder',
+            name='escalated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='followupreminder',
+            name='rollover_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='followupreminder',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['counselor', 'follow_up_date'], name='followup_open_counselor_date'),
+        ),
+        migrations.AddIndex(
+            model_name='followupreminder',
+            index=models.Index(condition=models.Q(('escalated_at__isnull', True), ('is_completed', False)), fields=['follow_up_date'], name='followup_open_pending_date'),
+        ),
+    ]
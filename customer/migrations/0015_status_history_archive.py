@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0014_followup_dispatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStatusHistoryArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('customer_id', models.UUIDField()),
+                ('previous_status', models.CharField(blank=True, choices=[('INVALID', 'Invalid'), ('VALID', 'Valid'), ('CALL_NOT_ATTENDED', 'Call Not Attended'), ('PLAN_PRESENTED', 'Plan Presented'), ('INTERESTED', 'Interested'), ('NOT_INTERESTED', 'Not Interested'), ('FOLLOW_UP', 'Follow Up'), ('SHORTLISTED', 'Shortlisted'), ('CAMPUS_VISIT', 'Campus Visit'), ('REGISTRATION', 'Registration'), ('ADMISSION', 'Admission')], max_length=20, null=True)),
+                ('new_status', models.CharField(choices=[('INVALID', 'Invalid'), ('VALID', 'Valid'), ('CALL_NOT_ATTENDED', 'Call Not Attended'), ('PLAN_PRESENTED', 'Plan Presented'), ('INTERESTED', 'Interested'), ('NOT_INTERESTED', 'Not Interested'), ('FOLLOW_UP', 'Follow Up'), ('SHORTLISTED', 'Shortlisted'), ('CAMPUS_VISIT', 'Campus Visit'), ('REGISTRATION', 'Registration'), ('ADMISSION', 'Admission')], max_length=20)),
+                ('changed_by_id', models.BigIntegerField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer_id', '-changed_at'], name='history_archive_customer')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0015_status_history_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileimport',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
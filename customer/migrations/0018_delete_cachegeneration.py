@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0017_cachegeneration'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='CacheGeneration',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0018_delete_cachegeneration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerevent',
+            name='transaction_id',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='customerevent',
+            index=models.Index(fields=['transaction_id', 'id'], name='customer_event_commit_order'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:44
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_complete(apps, schema_editor):
+    # Imports recorded before the field existed have already ended one way or another
+    FileImport = apps.get_model('customer', 'FileImport')
+    FileImport.objects.update(completed_at=F('imported_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0019_customerevent_transaction_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileimport',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_complete, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -14,6 +15,10 @@ class User(AbstractUser):
     ]
 
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default=SALES)
+    # Auto-assignment: maximum open customers (blank uses AUTO_ASSIGN_DEFAULT_CAPACITY)
+    # and comma-separated areas this counsellor is preferred for
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    areas = models.CharField(max_length=255, blank=True, default='')
 
     groups = models.ManyToManyField(
         Group,
@@ -36,6 +41,9 @@ class User(AbstractUser):
     def is_sales(self):
         return self.role == self.SALES
 
+    def area_list(self):
+        return [area.strip().lower() for area in self.areas.split(',') if area.strip()]
+
 class CustomerStatus(models.TextChoices):
     INVALID = 'INVALID', _('Invalid')
     VALID = 'VALID', _('Valid')
@@ -81,6 +89,9 @@ class Customer(models.Model):
         db_index=True
     )
     notes = models.TextField(blank=True, null=True)
+    # Incremented on every write for optimistic concurrency control: save(),
+    # status transitions and every bulk update path bump it
+    version = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -90,6 +101,25 @@ class Customer(models.Model):
     def __str__(self):
         return self.phone_number
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        # Bump in the database so a status change that read the row before
+        # this save fails its compare-and-swap instead of overwriting it
+        version = self.version
+        self.version = F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = version
+            raise
+        # No extra SELECT: if another write bumped the row in between, this
+        # copy stays behind and its next compare-and-swap fails, as it should
+        self.version = version + 1
+
     class Meta:
         # We can't use complex ordering in Meta, so we'll rely on the manager
         # This is a fallback ordering
@@ -101,12 +131,16 @@ class FileImport(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     file_name = models.CharField(max_length=255)
     file = models.FileField(upload_to='imports/')
+    # SHA-256 of the uploaded bytes, to spot re-uploads of the same file
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     imported_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='file_imports')
 
     imported_at = models.DateTimeField(auto_now_add=True)
     total_records = models.IntegerField(default=0)
     successful_records = models.IntegerField(default=0)
     failed_records = models.IntegerField(default=0)
+    # Set once the import has processed every row; empty until then
+    completed_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.file_name
@@ -127,6 +161,30 @@ class CustomerStatusHistory(models.Model):
         return f"{self.customer.name} - {self.new_status}"
 
 
+class CustomerStatusHistoryArchive(models.Model):
+    """
+    Status history moved off the hot table by ``archive_status_history``.
+    Keeps the original ids but no foreign key constraints, so archived rows
+    are cheap to write and never block deleting a customer or user.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    customer_id = models.UUIDField()
+    previous_status = models.CharField(max_length=20, choices=CustomerStatus.choices, null=True, blank=True)
+    new_status = models.CharField(max_length=20, choices=CustomerStatus.choices)
+    changed_by_id = models.BigIntegerField(null=True, blank=True)
+    changed_at = models.DateTimeField()
+    notes = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.customer_id} - {self.new_status}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer_id', '-changed_at'], name='history_archive_customer'),
+        ]
+
+
 class FollowUpReminder(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='follow_ups', db_index=True)
@@ -135,6 +193,9 @@ class FollowUpReminder(models.Model):
     notes = models.TextField(blank=True, null=True)
     status_history = models.OneToOneField(CustomerStatusHistory, on_delete=models.CASCADE, related_name='follow_up_reminder', null=True, blank=True)
     is_completed = models.BooleanField(default=False)
+    # Times the dispatcher carried this reminder over to a later day
+    rollover_count = models.PositiveSmallIntegerField(default=0)
+    escalated_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -143,3 +204,70 @@ class FollowUpReminder(models.Model):
 
     class Meta:
         ordering = ['follow_up_date', '-created_at']
+        # Only open reminders are ever looked up by date, so index just those
+        indexes = [
+            models.Index(
+                fields=['counselor', 'follow_up_date'],
+                condition=models.Q(is_completed=False),
+                name='followup_open_counselor_date',
+            ),
+            models.Index(
+                fields=['follow_up_date'],
+                condition=models.Q(is_completed=False, escalated_at__isnull=True),
+                name='followup_open_pending_date',
+            ),
+        ]
+
+
+class FollowUpSummary(models.Model):
+    """
+    Per-counsellor open reminder counts, so dashboards don't aggregate on each
+    load. Follow-up writes adjust the affected counsellors' counts in their
+    own transaction; the scheduled ``dispatch_followups`` run recounts them
+    and rolls them over to the new day.
+    """
+    counselor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='follow_up_summary')
+    due_count = models.PositiveIntegerField(default=0)
+    overdue_count = models.PositiveIntegerField(default=0)
+    escalated_count = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.counselor}: {self.due_count} due, {self.overdue_count} overdue"
+
+
+class CustomerEvent(models.Model):
+    """
+    Append-only log of customer changes, written in the same transaction as
+    the change. Consumers tail it in commit order with ``events_after``.
+    Rows are never updated or deleted; customer and actor are stored as
+    plain ids so the log outlives the records it describes.
+    """
+    STATUS = 'status'
+    ASSIGNMENT = 'assignment'
+    IMPORT = 'import'
+
+    EVENT_TYPE_CHOICES = [
+        (STATUS, 'Status change'),
+        (ASSIGNMENT, 'Assignment change'),
+        (IMPORT, 'Import upsert'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    customer_id = models.UUIDField(db_index=True)
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    old_value = models.CharField(max_length=255, null=True, blank=True)
+    new_value = models.CharField(max_length=255, null=True, blank=True)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # PostgreSQL id of the writing transaction (0 elsewhere), for commit-ordered tailing
+    transaction_id = models.BigIntegerField(default=0, editable=False)
+
+    def __str__(self):
+        return f"{self.event_type} {self.customer_id}: {self.old_value} -> {self.new_value}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['transaction_id', 'id'], name='customer_event_commit_order'),
+        ]
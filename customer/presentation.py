@@ -0,0 +1,96 @@
+"""
+Badge and icon HTML for customer statuses, rendered once at import time.
+
+The site templates use Tailwind classes and the admin uses inline styles;
+both are built from the one table below, so adding a status only means
+adding a row here.
+"""
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from .models import CustomerStatus
+
+# status: (Tailwind colour, admin background, admin text colour, Font Awesome icon)
+STATUS_STYLES = {
+    CustomerStatus.INVALID: ('red', '#FFCDD2', '#C62828', 'fas fa-times-circle'),
+    CustomerStatus.VALID: ('green', '#C8E6C9', '#2E7D32', 'fas fa-check-circle'),
+    CustomerStatus.CALL_NOT_ATTENDED: ('yellow', '#FFF9C4', '#F57F17', 'fas fa-phone-slash'),
+    CustomerStatus.PLAN_PRESENTED: ('purple', '#E1BEE7', '#6A1B9A', 'fas fa-file-alt'),
+    CustomerStatus.INTERESTED: ('blue', '#BBDEFB', '#1565C0', 'fas fa-thumbs-up'),
+    CustomerStatus.NOT_INTERESTED: ('gray', '#CFD8DC', '#455A64', 'fas fa-thumbs-down'),
+    CustomerStatus.FOLLOW_UP: ('indigo', '#C5CAE9', '#283593', 'fas fa-calendar-check'),
+    CustomerStatus.SHORTLISTED: ('green', '#B2DFDB', '#00695C', 'fas fa-star'),
+    CustomerStatus.CAMPUS_VISIT: ('orange', '#FFCC80', '#EF6C00', 'fas fa-building'),
+    CustomerStatus.REGISTRATION: ('teal', '#80CBC4', '#00796B', 'fas fa-clipboard-list'),
+    CustomerStatus.ADMISSION: ('pink', '#F8BBD0', '#AD1457', 'fas fa-graduation-cap'),
+}
+UNKNOWN_STYLE = ('gray', '#E0E0E0', '#616161', 'fas fa-question-circle')
+
+# Tailwind colour: (badge classes, icon class). Written out in full because
+# the Tailwind build only keeps class names it finds verbatim in this file.
+COLOUR_CLASSES = {
+    'red': ('bg-red-100 text-red-800', 'text-red-500'),
+    'green': ('bg-green-100 text-green-800', 'text-green-500'),
+    'yellow': ('bg-yellow-100 text-yellow-800', 'text-yellow-500'),
+    'purple': ('bg-purple-100 text-purple-800', 'text-purple-500'),
+    'blue': ('bg-blue-100 text-blue-800', 'text-blue-500'),
+    'gray': ('bg-gray-100 text-gray-800', 'text-gray-500'),
+    'indigo': ('bg-indigo-100 text-indigo-800', 'text-indigo-500'),
+    'orange': ('bg-orange-100 text-orange-800', 'text-orange-500'),
+    'teal': ('bg-teal-100 text-teal-800', 'text-teal-500'),
+    'pink': ('bg-pink-100 text-pink-800', 'text-pink-500'),
+}
+
+ADMIN_BADGE = (
+    '<span style="background-color: {}; color: {}; padding: 3px 8px; border-radius: 10px; font-size: 0.8em;">'
+    '<i class="{}"></i> {}</span>'
+)
+ADMIN_ARROW = mark_safe('<i class="fas fa-arrow-right" style="margin: 0 5px;"></i>')
+
+
+class StatusPresentation:
+    """Pre-rendered, already-safe HTML for one status."""
+
+    __slots__ = ('value', 'label', 'badge', 'icon', 'admin_badge')
+
+    def __init__(self, value, label, style):
+        colour, admin_bg, admin_colour, icon = style
+        badge_classes, icon_class = COLOUR_CLASSES[colour]
+        self.value = value
+        self.label = label
+        self.badge = format_html(
+            '<span class="inline-flex items-center px-2.5 py-1 rounded-full text-xs font-medium {}">'
+            '<i class="{} mr-1"></i> {}</span>',
+            badge_classes, icon, label
+        )
+        self.icon = format_html('<i class="{} {}"></i>', icon, icon_class)
+        self.admin_badge = format_html(ADMIN_BADGE, admin_bg, admin_colour, icon, label)
+
+
+REGISTRY = {
+    value: StatusPresentation(value, str(label), STATUS_STYLES.get(value, UNKNOWN_STYLE))
+    for value, label in CustomerStatus.choices
+}
+NO_STATUS = StatusPresentation('', 'No Status', UNKNOWN_STYLE)
+NO_PREVIOUS_STATUS = StatusPresentation('', 'None', UNKNOWN_STYLE)
+
+
+def presentation(status, empty=NO_STATUS):
+    """
+    Return the ``StatusPresentation`` for ``status``; values outside
+    ``CustomerStatus`` (e.g. from old data) are rendered on the fly.
+    """
+    if not status:
+        return empty
+    try:
+        return REGISTRY[status]
+    except KeyError:
+        return StatusPresentation(status, status, UNKNOWN_STYLE)
+
+
+def admin_status_change(previous_status, new_status):
+    # Every part is already escaped, so plain concatenation is safe
+    return mark_safe(
+        f'{presentation(previous_status, NO_PREVIOUS_STATUS).admin_badge} {ADMIN_ARROW} '
+        f'{presentation(new_status).admin_badge}'
+    )
@@ -0,0 +1,194 @@
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import FollowUpReminder, FollowUpSummary
+
+
+class DispatchResult:
+    """Outcome of one dispatcher run."""
+
+    def __init__(self, rolled_over, escalated, due, overdue, elapsed):
+        self.rolled_over = rolled_over
+        self.escalated = escalated
+        self.due = due
+        self.overdue = overdue
+        self.elapsed = elapsed
+
+
+def open_reminders(counsellor=None):
+    """Open reminders, optionally for one counsellor; served by the partial indexes."""
+    queryset = FollowUpReminder.objects.filter(is_completed=False)
+    if counsellor is not None:
+        queryset = queryset.filter(counselor=counsellor)
+    return queryset
+
+
+def due_reminders(counsellor, today=None):
+    """Open reminders for ``counsellor`` due today or earlier, oldest first."""
+    today = today or timezone.localdate()
+    return (
+        open_reminders(counsellor)
+        .filter(follow_up_date__lte=today)
+        .select_related('customer')
+        .order_by('follow_up_date', 'created_at')
+    )
+
+
+def process_overdue(today=None, batch_size=1000, max_rollovers=None):
+    """
+    Roll open reminders dated before ``today`` over to ``today``, or escalate
+    them once they have been rolled over ``max_rollovers`` times. Works in
+    batches of ``batch_size``, each in its own short transaction; on
+    PostgreSQL rows locked by a concurrent dispatcher are skipped. Escalated
+    reminders keep their date and are not processed again. Returns
+    (rolled over, escalated).
+    """
+    today = today or timezone.localdate()
+    if max_rollovers is None:
+        max_rollovers = getattr(settings, 'FOLLOW_UP_MAX_ROLLOVERS', 3)
+
+    pending = FollowUpReminder.objects.filter(
+        is_completed=False, escalated_at__isnull=True, follow_up_date__lt=today
+    )
+    rolled_over = escalated = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                pending.select_for_update(skip_locked=True)
+                .order_by('follow_up_date', 'id')
+                .values_list('id', 'rollover_count')[:batch_size]
+            )
+            if not batch:
+                break
+
+            now = timezone.now()
+            roll = [reminder_id for reminder_id, count in batch if count < max_rollovers]
+            escalate = [reminder_id for reminder_id, count in batch if count >= max_rollovers]
+            if roll:
+                rolled_over += FollowUpReminder.objects.filter(id__in=roll).update(
+                    follow_up_date=today, rollover_count=F('rollover_count') + 1, updated_at=now
+                )
+            if escalate:
+                escalated += FollowUpReminder.objects.filter(id__in=escalate).update(
+                    escalated_at=now, updated_at=now
+                )
+
+        if len(batch) < batch_size:
+            break
+
+    return rolled_over, escalated
+
+
+def refresh_summaries(today=None):
+    """
+    Recount every counsellor's due/overdue/escalated reminders with one
+    aggregate query, upsert the ``FollowUpSummary`` rows and drop those of
+    counsellors with nothing due. Returns the totals as (due, overdue).
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    rows = (
+        open_reminders().filter(follow_up_date__lte=today)
+        .order_by()
+        .values('counselor')
+        .annotate(
+            due=Count('id', filter=Q(follow_up_date=today)),
+            overdue=Count('id', filter=Q(follow_up_date__lt=today)),
+            escalated=Count('id', filter=Q(escalated_at__isnull=False)),
+        )
+    )
+    refreshed = [
+        FollowUpSummary(
+            counselor_id=row['counselor'],
+            due_count=row['due'],
+            overdue_count=row['overdue'],
+            escalated_count=row['escalated'],
+            refreshed_at=now,
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        FollowUpSummary.objects.bulk_create(
+            refreshed,
+            update_conflicts=True,
+            unique_fields=['counselor'],
+            update_fields=['due_count', 'overdue_count', 'escalated_count', 'refreshed_at'],
+        )
+        FollowUpSummary.objects.exclude(counselor__in=[summary.counselor_id for summary in refreshed]).delete()
+
+    return sum(summary.due_count for summary in refreshed), sum(summary.overdue_count for summary in refreshed)
+
+
+def adjust_summaries(closed=(), opened=(), today=None):
+    """
+    Apply a follow-up write to the dashboard counts as deltas
+    (``due_count = due_count + n``) instead of a recount, so writers only
+    touch their counsellors' summary rows. ``closed`` and ``opened`` are the
+    open reminders the write removed and added, as ``(counsellor_id,
+    follow_up_date, escalated_at)`` tuples; a rescheduled reminder is closed
+    with its old date and opened with the new one.
+
+    Counts never go below zero. ``dispatch`` recounts everything on its
+    schedule, which rolls the counts over to the new day and corrects any
+    drift.
+    """
+    today = today or timezone.localdate()
+    deltas = {}
+    for sign, reminders in ((-1, closed), (1, opened)):
+        for counsellor_id, follow_up_date, escalated_at in reminders:
+            if follow_up_date is None or follow_up_date > today:
+                continue
+            delta = deltas.setdefault(counsellor_id, [0, 0, 0])
+            delta[0] += sign * (follow_up_date == today)
+            delta[1] += sign * (follow_up_date < today)
+            delta[2] += sign * (escalated_at is not None)
+
+    now = timezone.now()
+    for counsellor_id, (due, overdue, escalated) in sorted(deltas.items()):
+        if not (due or overdue or escalated):
+            continue
+        summary = FollowUpSummary.objects.filter(counselor_id=counsellor_id)
+        changes = {
+            'due_count': Greatest(F('due_count') + due, 0),
+            'overdue_count': Greatest(F('overdue_count') + overdue, 0),
+            'escalated_count': Greatest(F('escalated_count') + escalated, 0),
+            'refreshed_at': now,
+        }
+        if summary.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                FollowUpSummary.objects.create(
+                    counselor_id=counsellor_id,
+                    due_count=max(due, 0),
+                    overdue_count=max(overdue, 0),
+                    escalated_count=max(escalated, 0),
+                    refreshed_at=now,
+                )
+        except IntegrityError:
+            # A concurrent write created the row first
+            summary.update(**changes)
+
+
+def dispatch(today=None, batch_size=1000, max_rollovers=None):
+    """Process overdue reminders, then refresh every counsellor's dashboard counts."""
+    start = time.perf_counter()
+    rolled_over, escalated = process_overdue(today, batch_size=batch_size, max_rollovers=max_rollovers)
+    due, overdue = refresh_summaries(today)
+    return DispatchResult(rolled_over, escalated, due, overdue, time.perf_counter() - start)
+
+
+def summary_counts(counsellor_ids):
+    """Return {counsellor_id: FollowUpSummary} with zeroed entries for counsellors without one."""
+    summaries = FollowUpSummary.objects.in_bulk(counsellor_ids)
+    return {
+        counsellor_id: summaries.get(counsellor_id) or FollowUpSummary(counselor_id=counsellor_id)
+        for counsellor_id in counsellor_ids
+    }
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+
+VERSION_KEY = 'customer:roster:version'
+
+_lock = threading.Lock()
+_cached_version = None
+_cached_roster = None
+_loaded_at = 0.0
+
+
+class Counsellor:
+    """
+    Read-only snapshot of a SALES user, shaped like ``User`` for templates
+    (``id``, ``username``, ``get_full_name``).
+    """
+
+    __slots__ = ('id', 'username', 'first_name', 'last_name', 'role', 'is_active')
+
+    def __init__(self, id, username, first_name, last_name, role, is_active):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+        self.role = role
+        self.is_active = is_active
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    @property
+    def display_name(self):
+        return self.get_full_name() or self.username
+
+    def __str__(self):
+        return self.display_name
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def invalidate_roster():
+    """Make every worker reload the roster on its next read."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the roster doesn't hold
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    # Bump after commit so no worker reloads the roster before the change is visible
+    transaction.on_commit(invalidate_roster)
+
+
+def get_roster():
+    """
+    Return {user_id: Counsellor} for every active SALES user, ordered by
+    username.
+
+    The roster is kept in process memory and reloaded when the shared
+    version key moves, so a read costs one cache lookup instead of a query.
+    With a per-process cache other workers never see the version move, so
+    the roster is also reloaded after ``ROSTER_MAX_AGE`` seconds.
+    """
+    global _cached_version, _cached_roster, _loaded_at
+
+    version = _version()
+    max_age = getattr(settings, 'ROSTER_MAX_AGE', 60)
+    if _cached_roster is not None and _cached_version == version and time.monotonic() - _loaded_at < max_age:
+        return _cached_roster
+
+    with _lock:
+        if _cached_roster is None or _cached_version != version or time.monotonic() - _loaded_at >= max_age:
+            # Always from the primary: a lagging replica would be cached until the next change
+            rows = (
+                User.objects.using('default').filter(role=User.SALES, is_active=True)
+                .order_by('username')
+                .values_list('id', 'username', 'first_name', 'last_name', 'role', 'is_active')
+            )
+            _cached_roster = {row[0]: Counsellor(*row) for row in rows}
+            _cached_version = version
+            _loaded_at = time.monotonic()
+    return _cached_roster
+
+
+def counsellors():
+    """All active SALES users as ``Counsellor`` snapshots, ordered by username."""
+    return list(get_roster().values())
+
+
+def get_counsellor(user_id):
+    """Return the ``Counsellor`` with ``user_id`` or None if it isn't an active SALES user."""
+    try:
+        return get_roster().get(int(user_id))
+    except (TypeError, ValueError):
+        return None
+
@@ -0,0 +1,297 @@
+import uuid
+
+from django.db import transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.utils import timezone
+
+from . import events
+from .facets import invalidate_facet_counts
+from .forms import CustomerStatusForm
+from .models import Customer, CustomerEvent, CustomerStatus, CustomerStatusHistory, FollowUpReminder
+from .reminders import adjust_summaries
+
+# Upper bound on the number of changes accepted in one batch request
+MAX_BATCH_SIZE = 500
+
+
+class StatusConflict(Exception):
+    """
+    Raised when a customer was changed by someone else between the time the
+    caller read it and the time it tried to write its status.
+    """
+
+    def __init__(self, status, version):
+        super().__init__(f'Customer changed concurrently (now {status!r}, version {version})')
+        self.status = status
+        self.version = version
+
+
+def transition_status(user, customer, new_status, notes=None, follow_up_date=None, expected_version=None):
+    """
+    Move ``customer`` to ``new_status`` if nobody else changed it since it was
+    read.
+
+    The status write is a compare-and-swap on ``Customer.version`` touching
+    only ``status``, ``version`` and ``updated_at``; the history row,
+    follow-up reminder changes and the affected counsellors' follow-up
+    summaries commit atomically with it. Raises
+    ``StatusConflict`` instead of overwriting a concurrent change. Returns the
+    created ``CustomerStatusHistory``.
+    """
+    if expected_version is None:
+        expected_version = customer.version
+    elif expected_version != customer.version:
+        raise StatusConflict(customer.status, customer.version)
+
+    previous_status = customer.status
+    now = timezone.now()
+
+    with transaction.atomic():
+        updated = Customer.objects.filter(pk=customer.pk, version=expected_version).update(
+            status=new_status,
+            version=F('version') + 1,
+            updated_at=now,
+        )
+        if not updated:
+            current = Customer.objects.filter(pk=customer.pk).values('status', 'version').first() or {}
+            raise StatusConflict(current.get('status'), current.get('version'))
+
+        customer.status = new_status
+        customer.version = expected_version + 1
+        customer.updated_at = now
+
+        status_history = CustomerStatusHistory.objects.create(
+            customer=customer,
+            previous_status=previous_status,
+            new_status=new_status,
+            changed_by=user,
+            changed_at=now,
+            notes=notes
+        )
+        events.record(CustomerEvent.STATUS, customer.pk, previous_status, new_status, actor=user)
+
+        if new_status == CustomerStatus.FOLLOW_UP and follow_up_date:
+            # Keep the newest open reminder and close any stray duplicates
+            reminders = list(
+                FollowUpReminder.objects.select_for_update()
+                .filter(customer=customer, is_completed=False)
+                .order_by('-created_at')
+            )
+            if reminders:
+                closed = [
+                    (reminder.counselor_id, reminder.follow_up_date, reminder.escalated_at) for reminder in reminders
+                ]
+                reminder = reminders[0]
+                opened = [(reminder.counselor_id, follow_up_date, reminder.escalated_at)]
+                reminder.follow_up_date = follow_up_date
+                reminder.notes = notes
+                reminder.status_history = status_history
+                reminder.save(update_fields=['follow_up_date', 'notes', 'status_history', 'updated_at'])
+                if len(reminders) > 1:
+                    FollowUpReminder.objects.filter(
+                        pk__in=[duplicate.pk for duplicate in reminders[1:]]
+                    ).update(is_completed=True, updated_at=now)
+            else:
+                closed = []
+                opened = [(user.pk, follow_up_date, None)]
+                FollowUpReminder.objects.create(
+                    customer=customer,
+                    counselor=user,
+                    follow_up_date=follow_up_date,
+                    notes=notes,
+                    status_history=status_history
+                )
+            adjust_summaries(closed=closed, opened=opened)
+        elif previous_status == CustomerStatus.FOLLOW_UP and new_status != CustomerStatus.FOLLOW_UP:
+            reminders = FollowUpReminder.objects.filter(customer=customer, is_completed=False)
+            closed = list(reminders.values_list('counselor', 'follow_up_date', 'escalated_at'))
+            if closed:
+                reminders.update(is_completed=True, updated_at=now)
+                adjust_summaries(closed=closed)
+
+        transaction.on_commit(invalidate_facet_counts)
+
+    return status_history
+
+
+def _error(customer_id, message):
+    return {'customer_id': customer_id, 'success': False, 'error': message}
+
+
+def batch_update_status(user, updates):
+    """
+    Apply many status changes in one transaction with a constant number of
+    queries, regardless of batch size:
+
+    1. one SELECT for the affected customers (locked on PostgreSQL)
+    2. one CASE UPDATE for their status
+    3. one bulk INSERT for the status history (the matching change events
+       are written after commit with the rest of the request's events)
+    4. one SELECT, one bulk UPDATE and one bulk INSERT for follow-up reminders
+    5. one SELECT and one UPDATE completing reminders of customers leaving
+       FOLLOW_UP
+    6. a lock, an aggregate, an upsert and a DELETE refreshing the affected
+       counsellors' follow-up summaries
+
+    ``updates`` is a list of dicts with ``customer_id``, ``status`` and the
+    optional ``notes``, ``follow_up_date`` and ``version`` keys. Returns one result dict
+    per input item, in input order.
+    """
+    results = [None] * len(updates)
+    pending = {}
+    status_labels = dict(CustomerStatus.choices)
+
+    # Validate each item without touching the database
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict):
+            results[index] = _error(None, 'Invalid item')
+            continue
+
+        customer_id = str(item.get('customer_id', ''))
+        try:
+            customer_uuid = uuid.UUID(customer_id)
+        except ValueError:
+            results[index] = _error(customer_id, 'Invalid customer id')
+            continue
+
+        if customer_uuid in pending:
+            results[index] = _error(customer_id, 'Duplicate customer in batch')
+            continue
+
+        form = CustomerStatusForm(item)
+        if not form.is_valid():
+            results[index] = _error(customer_id, 'Invalid form data')
+            continue
+
+        pending[customer_uuid] = (index, form.cleaned_data)
+
+    if not pending:
+        return results
+
+    now = timezone.now()
+
+    with transaction.atomic():
+        customers = {
+            row['id']: row
+            for row in Customer.objects.select_for_update()
+            .filter(id__in=list(pending))
+            .order_by()
+            .values('id', 'status', 'assigned_to_id', 'version')
+        }
+
+        changes = []
+        for customer_uuid, (index, cleaned) in pending.items():
+            customer = customers.get(customer_uuid)
+            if customer is None:
+                results[index] = _error(str(customer_uuid), 'Customer not found')
+            elif not user.is_manager() and customer['assigned_to_id'] != user.id:
+                results[index] = _error(str(customer_uuid), 'Permission denied')
+            elif cleaned.get('version') is not None and cleaned['version'] != customer['version']:
+                results[index] = _error(str(customer_uuid), 'Conflict: customer was updated by someone else')
+            else:
+                changes.append((customer_uuid, customer['status'], cleaned))
+
+        if not changes:
+            return results
+
+        ids_by_status = {}
+        for customer_uuid, _, cleaned in changes:
+            ids_by_status.setdefault(cleaned['status'], []).append(customer_uuid)
+
+        Customer.objects.filter(id__in=[change[0] for change in changes]).update(
+            status=Case(
+                *[When(id__in=ids, then=Value(status)) for status, ids in ids_by_status.items()],
+                output_field=CharField(),
+            ),
+            version=F('version') + 1,
+            updated_at=now,
+        )
+
+        history_by_customer = {}
+        for customer_uuid, previous_status, cleaned in changes:
+            history_by_customer[customer_uuid] = CustomerStatusHistory(
+                customer_id=customer_uuid,
+                previous_status=previous_status,
+                new_status=cleaned['status'],
+                changed_by=user,
+                changed_at=now,
+                notes=cleaned['notes'],
+            )
+        CustomerStatusHistory.objects.bulk_create(history_by_customer.values())
+        events.record_many(
+            CustomerEvent.STATUS,
+            [(customer_uuid, previous_status, cleaned['status']) for customer_uuid, previous_status, cleaned in changes],
+            actor=user,
+        )
+
+        follow_ups = {
+            customer_uuid: cleaned
+            for customer_uuid, _, cleaned in changes
+            if cleaned['status'] == CustomerStatus.FOLLOW_UP and cleaned.get('follow_up_date')
+        }
+        leaving_follow_up = [
+            customer_uuid
+            for customer_uuid, previous_status, cleaned in changes
+            if previous_status == CustomerStatus.FOLLOW_UP and cleaned['status'] != CustomerStatus.FOLLOW_UP
+        ]
+
+        closed = []
+        opened = []
+        if follow_ups:
+            # Reuse the newest open reminder per customer, create the rest
+            open_reminders = {}
+            for reminder in FollowUpReminder.objects.filter(
+                customer_id__in=list(follow_ups), is_completed=False
+            ).order_by('customer_id', '-created_at'):
+                open_reminders.setdefault(reminder.customer_id, reminder)
+
+            to_update = []
+            to_create = []
+            for customer_uuid, cleaned in follow_ups.items():
+                reminder = open_reminders.get(customer_uuid)
+                if reminder is None:
+                    to_create.append(FollowUpReminder(
+                        customer_id=customer_uuid,
+                        counselor=user,
+                        follow_up_date=cleaned['follow_up_date'],
+                        notes=cleaned['notes'],
+                        status_history=history_by_customer[customer_uuid],
+                    ))
+                else:
+                    closed.append((reminder.counselor_id, reminder.follow_up_date, reminder.escalated_at))
+                    reminder.follow_up_date = cleaned['follow_up_date']
+                    reminder.notes = cleaned['notes']
+                    reminder.status_history = history_by_customer[customer_uuid]
+                    reminder.updated_at = now
+                    to_update.append(reminder)
+
+            opened.extend(
+                (reminder.counselor_id, reminder.follow_up_date, reminder.escalated_at)
+                for reminder in to_update + to_create
+            )
+            if to_update:
+                FollowUpReminder.objects.bulk_update(
+                    to_update, ['follow_up_date', 'notes', 'status_history', 'updated_at']
+                )
+            if to_create:
+                FollowUpReminder.objects.bulk_create(to_create)
+
+        if leaving_follow_up:
+            reminders = FollowUpReminder.objects.filter(customer_id__in=leaving_follow_up, is_completed=False)
+            closed.extend(reminders.values_list('counselor', 'follow_up_date', 'escalated_at'))
+            reminders.update(is_completed=True, updated_at=now)
+
+        adjust_summaries(closed=closed, opened=opened)
+
+        transaction.on_commit(invalidate_facet_counts)
+
+    for customer_uuid, _, cleaned in changes:
+        index = pending[customer_uuid][0]
+        results[index] = {
+            'customer_id': str(customer_uuid),
+            'success': True,
+            'status': cleaned['status'],
+            'status_display': status_labels[cleaned['status']],
+        }
+
+    return results
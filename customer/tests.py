@@ -1,3 +1,1085 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models.query import QuerySet
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import core.db
+from core import gunicorn_conf
+from core.warmup import HOT_TEMPLATES, warm_up
+from core.sessions import SessionStore as CachedSessionStore
+from core.db import StatementTimeout
+from core.nplusone import NPlusOneError, detect_repeated_queries
+from customer import health
+from customer import presentation as presentation_module
+from customer.admin import HISTORY_INLINE_LIMIT
+from customer.archive import archive_history
+from customer.auth import CachedModelBackend, user_cache_key
+from customer.dashboards import run_concurrently
+from customer.assignment import (
+    LEAST_LOADED, RANDOM, ROUND_ROBIN, apply_assignment, assign_customers, auto_assign, build_assignment,
+    _tablesample, claim_unassigned, sample_and_assign,
+)
+from customer.events import events_after
+from customer.facets import GENERATION_KEY, get_facet_counts
+from customer.forms import CustomerAssignForm
+from customer.presentation import presentation
+from customer.reminders import refresh_summaries, summary_counts
+from customer.roster import counsellors, get_counsellor, invalidate_roster
+from customer.models import (
+    Customer, CustomerEvent, CustomerStatus, CustomerStatusHistory, CustomerStatusHistoryArchive,
+    FileImport, FollowUpSummary, User,
+)
+from customer.services import StatusConflict, batch_update_status, transition_status
+from customer.views import HISTORY_PAGE_SIZE
+
+def facet_counts(facets, name):
+    return {item['value']: item['count'] for item in facets[name]}
+
+
+class FacetCountTests(TestCase):
+    """Customer list facets: one grouped query, cached per normalized filter, invalidated on commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', role=User.MANAGER)
+        cls.counsellor = User.objects.create_user('counsellor', role=User.SALES)
+        Customer.objects.create(
+            phone_number='9400000001', name='Asha Menon', area='North',
+            status=CustomerStatus.VALID, assigned_to=cls.counsellor,
+        )
+        cls.unassigned = Customer.objects.create(
+            phone_number='9400000002', name='Ravi', area='South', status=CustomerStatus.INTERESTED
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+
+    def test_counts_are_cached(self):
+        facets = get_facet_counts(Customer.objects.all(), self.manager)
+        self.assertEqual(facet_counts(facets, 'status'), {CustomerStatus.VALID: 1, CustomerStatus.INTERESTED: 1})
+        self.assertEqual(facet_counts(facets, 'counsellor'), {self.counsellor.pk: 1, '': 1})
+
+        # Only the generation counter is read on a hit
+        with self.assertNumQueries(0):
+            self.assertEqual(get_facet_counts(Customer.objects.all(), self.manager), facets)
+
+    def test_equivalent_searches_filter_alike(self):
+        for search in ('asha', '  ASHA  '):
+            response = self.client.get('/customers/', {'search': search}, secure=True)
+            self.assertEqual([customer.phone_number for customer in response.context['customers']], ['9400000001'])
+            self.assertEqual(facet_counts(response.context['facets'], 'status'), {CustomerStatus.VALID: 1})
+
+    def test_writes_invalidate_after_commit(self):
+        get_facet_counts(Customer.objects.all(), self.manager)
+        generation = cache.get(GENERATION_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            batch_update_status(self.manager, [{'customer_id': str(self.unassigned.pk), 'status': CustomerStatus.VALID}])
+            stale = get_facet_counts(Customer.objects.all(), self.manager)
+            self.assertEqual(facet_counts(stale, 'status'), {CustomerStatus.VALID: 1, CustomerStatus.INTERESTED: 1})
+
+        # One bump per committed write, shared by every worker on the same cache
+        self.assertEqual(cache.get(GENERATION_KEY), generation + 1)
+        facets = get_facet_counts(Customer.objects.all(), self.manager)
+        self.assertEqual(facet_counts(facets, 'status'), {CustomerStatus.VALID: 2})
+
+
+class BatchStatusUpdateTests(TestCase):
+    """The batch endpoint applies any number of changes with a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', role=User.MANAGER)
+        cls.customers = [
+            Customer.objects.create(phone_number=f'95000000{i:02d}', name=f'Customer {i}') for i in range(11)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def post(self, updates):
+        return self.client.post(
+            '/customers/batch-update-status/', json.dumps({'updates': updates}),
+            content_type='application/json', secure=True,
+        )
+
+    def queries_for(self, customers):
+        updates = [
+            {'customer_id': str(customer.pk), 'status': CustomerStatus.FOLLOW_UP, 'follow_up_date': '2030-01-01'}
+            for customer in customers
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(updates)
+        self.assertEqual(response.json()['updated'], len(customers))
+        return len(context)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        self.queries_for(self.customers[:1])  # loads and caches the session
+        self.assertEqual(self.queries_for(self.customers[1:3]), self.queries_for(self.customers[3:]))
+        self.assertEqual(
+            Customer.objects.filter(status=CustomerStatus.FOLLOW_UP, follow_ups__is_completed=False).count(), 11
+        )
+
+    def test_results_are_reported_per_item(self):
+        first, second = self.customers[:2]
+        results = self.post([
+            {'customer_id': str(first.pk), 'status': CustomerStatus.VALID, 'version': first.version},
+            {'customer_id': 'not-a-uuid', 'status': CustomerStatus.VALID},
+            {'customer_id': str(uuid.uuid4()), 'status': CustomerStatus.VALID},
+            {'customer_id': str(second.pk), 'status': CustomerStatus.VALID, 'version': second.version + 1},
+        ]).json()['results']
+
+        self.assertEqual([result['success'] for result in results], [True, False, False, False])
+        self.assertEqual(
+            [result.get('error') for result in results[1:]],
+            ['Invalid customer id', 'Customer not found', 'Conflict: customer was updated by someone else'],
+        )
+        self.assertEqual(list(CustomerStatusHistory.objects.values_list('customer_id', flat=True)), [first.pk])
+
+
+class StatusTransitionTests(TestCase):
+    """Status changes are a compare-and-swap on Customer.version, which every write path moves."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', role=User.MANAGER)
+        cls.counsellor = User.objects.create_user('counsellor', role=User.SALES)
+        cls.customer = Customer.objects.create(phone_number='9600000001', name='Asha')
+
+    def load(self):
+        return Customer.objects.get(pk=self.customer.pk)
+
+    def test_stale_transition_raises_conflict(self):
+        first, second = self.load(), self.load()
+        transition_status(self.manager, first, CustomerStatus.VALID)
+        with self.assertRaises(StatusConflict) as conflict:
+            transition_status(self.manager, second, CustomerStatus.INVALID)
+
+        self.assertEqual((conflict.exception.status, conflict.exception.version), (CustomerStatus.VALID, first.version))
+        self.assertEqual(self.load().status, CustomerStatus.VALID)
+        self.assertEqual(CustomerStatusHistory.objects.filter(customer=self.customer).count(), 1)
+
+    def test_save_moves_the_version(self):
+        stale, edited = self.load(), self.load()
+        edited.notes = 'Edited in the admin'
+        with self.assertNumQueries(1):
+            edited.save()
+        self.assertEqual(edited.version, stale.version + 1)
+        self.assertEqual(self.load().version, edited.version)
+
+        with self.assertRaises(StatusConflict):
+            transition_status(self.manager, stale, CustomerStatus.VALID)
+
+    def test_bulk_assignment_moves_the_version(self):
+        stale = self.load()
+        apply_assignment({self.counsellor.pk: [self.customer.pk]})
+        with self.assertRaises(StatusConflict):
+            transition_status(self.manager, stale, CustomerStatus.VALID)
+
+    def test_endpoint_reports_conflicts(self):
+        current = self.load()
+        transition_status(self.manager, current, CustomerStatus.VALID)
+        self.client.force_login(self.manager)
+
+        response = self.client.post(
+            f'/customers/{self.customer.pk}/update-status/',
+            {'status': CustomerStatus.INTERESTED, 'version': current.version - 1},
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], current.version)
+
+
+class AssignmentEngineTests(TestCase):
+    """Assignments are planned in memory and written with one UPDATE per counsellor."""
+
+    def test_random_strategy_balances_counsellors(self):
+        mapping = build_assignment(range(10), [1, 2, 3], RANDOM, rng=random.Random(0))
+        self.assertEqual(sorted(len(customer_ids) for customer_ids in mapping.values()), [3, 3, 4])
+        self.assertEqual(sorted(sum(mapping.values(), [])), list(range(10)))
+
+    def test_least_loaded_fills_the_emptiest_first(self):
+        mapping = build_assignment(range(4), [1, 2], LEAST_LOADED, loads={1: 3, 2: 0})
+        self.assertEqual(mapping, {1: [3], 2: [0, 1, 2]})
+
+    def test_query_count_does_not_grow_with_customers(self):
+        counsellor_ids = [User.objects.create_user(f'counsellor{i}', role=User.SALES).pk for i in range(3)]
+        customer_ids = [Customer.objects.create(phone_number=f'97000000{i:02d}').pk for i in range(21)]
+
+        with CaptureQueriesContext(connection) as few:
+            assign_customers(customer_ids[:3], counsellor_ids, strategy=ROUND_ROBIN)
+        with CaptureQueriesContext(connection) as many:
+            distribution = assign_customers(customer_ids[3:], counsellor_ids, strategy=ROUND_ROBIN)
+
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(distribution, dict.fromkeys(counsellor_ids, 6))
+        self.assertFalse(Customer.objects.filter(assigned_to__isnull=True).exists())
+
+
+class AutoAssignTests(TestCase):
+    """Auto-assignment respects capacity, skips inactive counsellors and prefers area matches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.north = User.objects.create_user('north', role=User.SALES, capacity=2, areas='North, East')
+        cls.south = User.objects.create_user('south', role=User.SALES, capacity=3, areas='South')
+        User.objects.create_user('inactive', role=User.SALES, is_active=False)
+        # Closed customers don't count towards capacity
+        Customer.objects.create(phone_number='9800000000', assigned_to=cls.south, status=CustomerStatus.ADMISSION)
+        for i, area in enumerate(['North', 'North', 'North', 'South', '', None]):
+            Customer.objects.create(phone_number=f'980000001{i}', area=area)
+
+    def test_assigns_within_capacity(self):
+        result = auto_assign()
+
+        self.assertEqual(result.distribution, {self.north.pk: 2, self.south.pk: 3})
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(list(Customer.objects.filter(assigned_to=self.north).values_list('area', flat=True)), ['North', 'North'])
+        self.assertEqual(Customer.objects.filter(assigned_to__isnull=True).count(), 1)
+        self.assertFalse(Customer.objects.filter(assigned_to__username='inactive').exists())
+
+
+class ClaimUnassignedTests(TestCase):
+    """Bulk claims take the newest unassigned customers in one statement and never overlap."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = User.objects.create_user('first', role=User.SALES)
+        cls.second = User.objects.create_user('second', role=User.SALES)
+        cls.taken = Customer.objects.create(phone_number='9810000000', assigned_to=cls.second).pk
+        start = timezone.now() - timedelta(days=1)
+        cls.unassigned = []
+        for i in range(5):
+            customer = Customer.objects.create(phone_number=f'981000001{i}')
+            Customer.objects.filter(pk=customer.pk).update(created_at=start + timedelta(minutes=i))
+            cls.unassigned.append(customer.pk)
+
+    def assigned(self, user):
+        return set(Customer.objects.filter(assigned_to=user).values_list('pk', flat=True))
+
+    def test_claims_newest_unassigned_customers(self):
+        self.assertEqual(claim_unassigned(self.first.pk, 3), 3)
+        self.assertEqual(self.assigned(self.first), set(self.unassigned[2:]))
+
+        # Only what is left, and nothing already assigned to someone else
+        self.assertEqual(claim_unassigned(self.second.pk, 3), 2)
+        self.assertEqual(self.assigned(self.second), {self.taken, *self.unassigned[:2]})
+        self.assertEqual(claim_unassigned(self.second.pk, 3), 0)
+
+
+
+class SampleAndAssignTests(TestCase):
+    """Random assignment samples uniformly from the given queryset, batch by batch."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = User.objects.create_user('counsellor', role=User.SALES)
+        cls.other = User.objects.create_user('other', role=User.SALES)
+        # Three ids crowded at the bottom of the key space and one far above
+        # them; a pivot into the key space would nearly always land on the last
+        cls.candidates = [
+            Customer.objects.create(id=uuid.UUID(int=position), phone_number=f'983000000{position}').pk
+            for position in (1, 2, 3)
+        ]
+        cls.candidates.append(Customer.objects.create(id=uuid.UUID(int=2 ** 127), phone_number='9830000009').pk)
+        cls.taken = Customer.objects.create(phone_number='9830000010', assigned_to=cls.other).pk
+
+    def test_assigns_only_from_queryset_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            assigned = sample_and_assign(
+                Customer.objects.filter(assigned_to__isnull=True), self.counsellor.pk, 10, batch_size=3
+            )
+
+        self.assertEqual(assigned, 4)
+        self.assertEqual(
+            set(Customer.objects.filter(assigned_to=self.counsellor).values_list('pk', flat=True)),
+            set(self.candidates),
+        )
+        self.assertEqual(CustomerEvent.objects.filter(event_type=CustomerEvent.ASSIGNMENT).count(), 4)
+
+    def test_forced_reassignment_logs_previous_assignee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_and_assign(Customer.objects.filter(pk=self.taken), self.counsellor.pk, 1)
+        self.assertEqual(CustomerEvent.objects.get().old_value, str(self.other.pk))
+
+    def test_sample_is_uniform(self):
+        picks = dict.fromkeys(self.candidates, 0)
+        unassigned = Customer.objects.filter(assigned_to__isnull=True)
+        for _ in range(200):
+            with transaction.atomic():
+                sample_and_assign(unassigned, self.counsellor.pk, 1)
+                picks[Customer.objects.get(assigned_to=self.counsellor).pk] += 1
+                transaction.set_rollback(True)
+
+        # 50 expected each; 20 is about five standard deviations out
+        self.assertTrue(all(count >= 20 for count in picks.values()), picks)
+
+    def test_postgresql_batches_sample_the_table_first(self):
+        sql = str(_tablesample(Customer.objects.filter(assigned_to__isnull=True), 1.5).query)
+        table = connection.ops.quote_name(Customer._meta.db_table)
+        self.assertIn(f'FROM {table} TABLESAMPLE SYSTEM (1.5)', sql)
+        self.assertEqual(sql.count('TABLESAMPLE'), 1)
+
+
+class CustomerEventLogTests(TestCase):
+    """The change log commits with the change, carries previous values and tails in commit order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', role=User.MANAGER)
+        cls.first = User.objects.create_user('first', role=User.SALES)
+        cls.second = User.objects.create_user('second', role=User.SALES)
+        cls.customer = Customer.objects.create(phone_number='9820000001', assigned_to=cls.first)
+
+    def test_reassignment_logs_previous_assignee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_assignment({self.second.pk: [self.customer.pk]}, actor=self.manager)
+
+        event = CustomerEvent.objects.get()
+        self.assertEqual(
+            (event.event_type, event.old_value, event.new_value, event.actor_id),
+            (CustomerEvent.ASSIGNMENT, str(self.first.pk), str(self.second.pk), self.manager.pk),
+        )
+
+    def test_claim_logs_only_claimed_rows(self):
+        unassigned = Customer.objects.create(phone_number='9820000002')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(claim_unassigned(self.second.pk, 5), 1)
+
+        event = CustomerEvent.objects.get()
+        self.assertEqual((event.customer_id, event.old_value), (unassigned.pk, None))
+
+    def test_events_commit_and_roll_back_with_the_change(self):
+        with transaction.atomic():
+            apply_assignment({self.second.pk: [self.customer.pk]})
+            self.assertTrue(CustomerEvent.objects.exists())
+            transaction.set_rollback(True)
+        self.assertFalse(CustomerEvent.objects.exists())
+
+    def test_events_after_tails_from_the_last_event(self):
+        apply_assignment({self.second.pk: [self.customer.pk]})
+        apply_assignment({self.first.pk: [self.customer.pk]})
+
+        first, second = events_after(0)
+        self.assertEqual(second.new_value, str(self.first.pk))
+        self.assertEqual(events_after(first.pk), [second])
+        self.assertEqual(events_after(second.pk), [])
+
+    def test_import_logs_only_inserted_rows(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        original = QuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, *args, **kwargs):
+            # Another import inserts the first new phone number in between
+            if queryset.model is Customer:
+                Customer.objects.create(phone_number=objs[0].phone_number, name='Concurrent')
+            return original(queryset, objs, *args, **kwargs)
+
+        self.client.force_login(self.manager)
+        upload = SimpleUploadedFile('customers.csv', b'phone_number,name\n9820000010,Asha\n9820000011,Ravi\n')
+        with override_settings(MEDIA_ROOT=media_root.name), \
+                mock.patch.object(QuerySet, 'bulk_create', racing_bulk_create), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/import/', {'file': upload}, secure=True)
+
+        logged = CustomerEvent.objects.filter(event_type=CustomerEvent.IMPORT).values_list('customer_id', flat=True)
+        self.assertEqual(list(logged), [Customer.objects.get(phone_number='9820000011').pk])
+        self.assertEqual(FileImport.objects.get().successful_records, 1)
+        self.assertEqual(Customer.objects.get(phone_number='9820000010').name, 'Concurrent')
+
+
+class FollowUpSummaryTests(TestCase):
+    """Dashboard follow-up counts change in the same transaction as the reminders."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = User.objects.create_user('counsellor', role=User.SALES)
+        cls.customer = Customer.objects.create(phone_number='9840000001', assigned_to=cls.counsellor)
+
+    def summary(self):
+        summary = summary_counts([self.counsellor.pk])[self.counsellor.pk]
+        return summary.due_count, summary.overdue_count
+
+    def test_single_transition_refreshes_summary(self):
+        today = timezone.localdate()
+        transition_status(self.counsellor, self.customer, CustomerStatus.FOLLOW_UP, follow_up_date=today)
+        self.assertEqual(self.summary(), (1, 0))
+
+        transition_status(self.counsellor, self.customer, CustomerStatus.INTERESTED)
+        self.assertEqual(self.summary(), (0, 0))
+        refresh_summaries()
+        self.assertFalse(FollowUpSummary.objects.exists())
+
+    def test_rescheduling_moves_the_counts(self):
+        today = timezone.localdate()
+        transition_status(self.counsellor, self.customer, CustomerStatus.FOLLOW_UP, follow_up_date=today - timedelta(days=2))
+        self.assertEqual(self.summary(), (0, 1))
+
+        self.customer.refresh_from_db()
+        with CaptureQueriesContext(connection) as context:
+            transition_status(self.counsellor, self.customer, CustomerStatus.FOLLOW_UP, follow_up_date=today)
+        self.assertEqual(self.summary(), (1, 0))
+        # Only the counsellor's summary row is written, never their user row
+        self.assertFalse(any(User._meta.db_table in query['sql'] for query in context.captured_queries))
+
+    def test_batch_update_refreshes_summary(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        other = Customer.objects.create(phone_number='9840000002', assigned_to=self.counsellor)
+        batch_update_status(self.counsellor, [
+            {'customer_id': str(self.customer.pk), 'status': CustomerStatus.FOLLOW_UP, 'follow_up_date': yesterday},
+            {'customer_id': str(other.pk), 'status': CustomerStatus.FOLLOW_UP, 'follow_up_date': timezone.localdate()},
+        ])
+        self.assertEqual(self.summary(), (1, 1))
+
+        batch_update_status(self.counsellor, [{'customer_id': str(other.pk), 'status': CustomerStatus.VALID}])
+        self.assertEqual(self.summary(), (0, 1))
+
+
+class HistoryArchiveTests(TestCase):
+    """Old history moves to the archive customer by customer; the admin only shows recent entries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser('manager', password='unused', role=User.MANAGER)
+        old = timezone.now() - timedelta(days=400)
+        cls.customers = []
+        for i in range(3):
+            customer = Customer.objects.create(phone_number=f'985000000{i}')
+            CustomerStatusHistory.objects.bulk_create([
+                CustomerStatusHistory(
+                    customer=customer, new_status=CustomerStatus.VALID, changed_by=cls.manager,
+                    changed_at=old + timedelta(days=day),
+                )
+                for day in range(4)
+            ])
+            CustomerStatusHistory.objects.create(customer=customer, new_status=CustomerStatus.VALID, changed_by=cls.manager)
+            cls.customers.append(customer)
+
+    def test_archives_all_but_recent_entries_in_customer_batches(self):
+        self.assertEqual(archive_history(days=180, keep_recent=2, dry_run=True).archived, 6)
+        self.assertEqual(archive_history(days=180, keep_recent=2, batch_size=2).archived, 6)
+
+        for customer in self.customers:
+            self.assertEqual(customer.status_history.count(), 3)
+            self.assertEqual(CustomerStatusHistoryArchive.objects.filter(customer_id=customer.pk).count(), 2)
+            # The two oldest entries went to the archive
+            self.assertLess(
+                CustomerStatusHistoryArchive.objects.filter(customer_id=customer.pk).latest('changed_at').changed_at,
+                customer.status_history.earliest('changed_at').changed_at,
+            )
+        self.assertEqual(archive_history(days=180, keep_recent=2).archived, 0)
+
+    def test_admin_inline_is_capped(self):
+        customer = self.customers[0]
+        CustomerStatusHistory.objects.bulk_create([
+            CustomerStatusHistory(customer=customer, new_status=CustomerStatus.VALID, changed_by=self.manager)
+            for _ in range(HISTORY_INLINE_LIMIT)
+        ])
+        self.client.force_login(self.manager)
+        response = self.client.get(f'/admin/customer/customer/{customer.pk}/change/', secure=True)
+
+        self.assertEqual(response.context['inline_admin_formsets'][0].formset.initial_form_count(), HISTORY_INLINE_LIMIT)
+        self.assertContains(response, f'?customer__id__exact={customer.pk}')
+        changelist = self.client.get(
+            f'/admin/customer/customerstatushistory/?customer__id__exact={customer.pk}', secure=True
+        )
+        self.assertEqual(changelist.context['cl'].result_count, HISTORY_INLINE_LIMIT + 5)
+
+
+class CustomerHistoryPageTests(TestCase):
+    """History pages are keyed by a cursor; a bad cursor is a client error."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', role=User.MANAGER)
+        cls.customer = Customer.objects.create(phone_number='9860000001')
+        start = timezone.now() - timedelta(days=1)
+        CustomerStatusHistory.objects.bulk_create([
+            CustomerStatusHistory(
+                customer=cls.customer, new_status=CustomerStatus.VALID, changed_by=cls.manager,
+                changed_at=start + timedelta(minutes=i % 3),
+            )
+            for i in range(HISTORY_PAGE_SIZE + 3)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def page(self, before=None):
+        data = {'format': 'json'}
+        if before is not None:
+            data['before'] = before
+        return self.client.get(f'/customers/{self.customer.pk}/history/', data, secure=True)
+
+    def test_cursor_walks_every_entry_once(self):
+        first = self.page().json()
+        second = self.page(first['next_cursor']).json()
+
+        self.assertIsNone(second['next_cursor'])
+        ids = [entry['id'] for entry in first['entries'] + second['entries']]
+        self.assertEqual(len(ids), HISTORY_PAGE_SIZE + 3)
+        self.assertEqual(set(ids), {str(pk) for pk in self.customer.status_history.values_list('pk', flat=True)})
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('garbage', f'2024-13-45T10:00:00|{uuid.uuid4()}', f'{timezone.now().isoformat()}|nope'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.page(cursor).status_code, 400)
+
+    def test_import_history_requires_login(self):
+        self.client.logout()
+        response = self.client.get('/import/history/', secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response['Location'])
+
+
+class CounsellorRosterTests(TestCase):
+    """The counsellor roster is served from memory and reloads once a user change commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asha = User.objects.create_user('asha', role=User.SALES, first_name='Asha')
+        cls.ravi = User.objects.create_user('ravi', role=User.SALES)
+        User.objects.create_user('manager', role=User.MANAGER)
+
+    def setUp(self):
+        invalidate_roster()
+
+    def test_roster_is_cached_between_changes(self):
+        self.assertEqual([counsellor.display_name for counsellor in counsellors()], ['Asha', 'ravi'])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_counsellor(self.ravi.pk).username, 'ravi')
+        self.assertIsNone(get_counsellor('not-an-id'))
+
+    def test_deactivated_counsellor_drops_out(self):
+        counsellors()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ravi.is_active = False
+            self.ravi.save()
+
+        self.assertEqual([counsellor.id for counsellor in counsellors()], [self.asha.pk])
+        self.assertIsNone(get_counsellor(self.ravi.pk))
+        self.assertNotIn(self.ravi, CustomerAssignForm().fields['assigned_to'].queryset)
+
+
+class CachedUserTests(TestCase):
+    """Deactivation and password changes end sessions even where a cached user was not invalidated."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user('asha', password='old-password', role=User.SALES)
+        self.client.force_login(self.user)
+
+    def logged_in(self):
+        return self.client.get('/customers/', secure=True).status_code == 200
+
+    def cache_stale_copy(self):
+        # What another worker's cache would still hold after the change below
+        cache.set(user_cache_key(self.user.pk), User.objects.get(pk=self.user.pk))
+
+    def test_per_process_cache_is_bypassed(self):
+        self.assertTrue(self.logged_in())
+        self.cache_stale_copy()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertFalse(self.logged_in())
+
+    def test_password_change_ends_session_despite_stale_copy(self):
+        self.cache_stale_copy()
+        User.objects.filter(pk=self.user.pk).update(password=make_password('new-password'))
+        self.assertFalse(self.logged_in())
+
+    @override_settings(SHARED_CACHE=True)
+    def test_shared_cache_is_invalidated_on_save(self):
+        self.assertTrue(self.logged_in())
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedModelBackend().get_user(self.user.pk), self.user)
+
+        self.user.set_password('new-password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertFalse(self.logged_in())
+
+    def test_sessions_from_before_the_cached_backend_still_resolve(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertTrue(self.logged_in())
+
+    def test_session_skips_unchanged_save(self):
+        store = CachedSessionStore()
+        store['theme'] = 'dark'
+        store.save()
+
+        reloaded = CachedSessionStore(store.session_key)
+        reloaded['theme'] = 'dark'
+        with self.assertNumQueries(0):
+            reloaded.save()
+
+
+class StatusPresentationTests(SimpleTestCase):
+    """Status badges are pre-rendered with class names the Tailwind build can see."""
+
+    def test_badge_classes_appear_whole_in_source(self):
+        with open(presentation_module.__file__) as source_file:
+            source = source_file.read()
+        for value, _ in CustomerStatus.choices:
+            rendered = presentation(value)
+            for html in (rendered.badge, rendered.icon):
+                for class_name in re.findall(r'class="([^"]*)"', html)[0].split():
+                    if class_name.startswith(('bg-', 'text-')):
+                        self.assertIn(class_name, source, value)
+
+    def test_badges_are_rendered_once_and_escaped(self):
+        self.assertIs(presentation(CustomerStatus.VALID), presentation(CustomerStatus.VALID))
+        self.assertIn('bg-green-100 text-green-800', presentation(CustomerStatus.VALID).badge)
+        self.assertIn('&lt;b&gt;', presentation('<b>').badge)
+        self.assertIn('No Status', presentation(None).badge)
+
+
+class DashboardAggregateTests(TestCase):
+    """Dashboard aggregates run side by side on pool threads that keep their connections."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', role=User.MANAGER)
+        counsellor = User.objects.create_user('counsellor', role=User.SALES)
+        Customer.objects.create(phone_number='9870000001', assigned_to=counsellor, status=CustomerStatus.VALID)
+        Customer.objects.create(phone_number='9870000002', status=CustomerStatus.INTERESTED)
+
+    def test_pool_threads_get_caller_context_and_wrappers(self):
+        flag = ContextVar('dashboard_test_flag', default=False)
+        token = flag.set(True)
+        self.addCleanup(flag.reset, token)
+        caller = threading.get_ident()
+        timeout = StatementTimeout(1000)
+
+        def worker_wrappers():
+            return list(connections['default'].execute_wrappers)
+
+        with connection.execute_wrapper(timeout), \
+                mock.patch('customer.dashboards.connection', SimpleNamespace(in_atomic_block=False)), \
+                mock.patch('customer.dashboards.close_old_connections') as close_old_connections:
+            results = run_concurrently(threading.get_ident, threading.get_ident, flag.get, worker_wrappers)
+
+        self.assertEqual(results[0], caller)
+        self.assertNotEqual(results[1], caller)
+        self.assertIs(results[2], True)
+        self.assertEqual(results[3], [timeout])
+        # Connections are only dropped when stale, as between requests
+        self.assertEqual(close_old_connections.call_count, 6)
+
+    def test_dashboards_render_synchronously(self):
+        self.client.force_login(self.manager)
+        response = self.client.get('/', secure=True)
+        self.assertEqual(
+            (response.context['total_customers'], response.context['assigned_customers']), (2, 1)
+        )
+        response = self.client.get('/customer-status/', secure=True)
+        self.assertEqual(response.context['status_data'][CustomerStatus.INTERESTED], 1)
+
+# What every gunicorn worker and serverless cold start loads before its first request
+STARTUP_SCRIPT = (
+    'import resource\n'
+    'from core.wsgi import application\n'
+    'from django.urls import resolve\n'
+    "resolve('/')\n"
+    # ru_maxrss survives exec, so it would report the test runner's size;
+    # Linux's VmHWM (kB, like ru_maxrss there) covers only this process
+    'try:\n'
+    "    with open('/proc/self/status') as f:\n"
+    "        print(next(line.split()[1] for line in f if line.startswith('VmHWM:')))\n"
+    'except OSError:\n'
+    '    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n'
+)
+
+# "import time: <self us> | <cumulative us> | <indent><module>"
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+# Data-processing dependencies that only the file import path may load
+LAZY_MODULES = ('pandas', 'numpy', 'openpyxl', 'faker')
+
+# Budgets can be raised for slow CI machines without editing the test
+STARTUP_IMPORT_BUDGET_MS = int(os.getenv('STARTUP_IMPORT_BUDGET_MS', 800))
+STARTUP_RSS_BUDGET_MB = int(os.getenv('STARTUP_RSS_BUDGET_MB', 70))
+
+
+class StartupBudgetTests(SimpleTestCase):
+    """
+    Start a fresh interpreter under ``-X importtime``, load the WSGI
+    application and URLconf, and check what it cost.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        cls.modules = set()
+        cls.import_ms = 0
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                _, cumulative, indent, module = match.groups()
+                cls.modules.add(module)
+                # Top-level entries already include their nested imports
+                if not indent:
+                    cls.import_ms += int(cumulative) / 1000
+
+        max_rss = int(result.stdout.split()[-1])
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        cls.rss_mb = max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+    def test_heavy_dependencies_load_lazily(self):
+        loaded = sorted({module.split('.')[0] for module in self.modules} & set(LAZY_MODULES))
+        self.assertEqual(loaded, [], 'Import these inside the code path that needs them')
+
+    def test_import_time_budget(self):
+        self.assertLessEqual(
+            self.import_ms, STARTUP_IMPORT_BUDGET_MS,
+            f'Startup imports took {self.import_ms:.0f}ms (budget {STARTUP_IMPORT_BUDGET_MS}ms)'
+        )
+
+    def test_rss_budget(self):
+        self.assertLessEqual(
+            self.rss_mb, STARTUP_RSS_BUDGET_MB,
+            f'Startup RSS is {self.rss_mb:.0f}MB (budget {STARTUP_RSS_BUDGET_MB}MB)'
+        )
+
+
+class WorkerWarmUpTests(SimpleTestCase):
+    """Gunicorn settings and the per-worker warm-up."""
+
+    def test_warm_up_compiles_templates_without_connecting(self):
+        with mock.patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as ensure, \
+                mock.patch('core.warmup.get_template') as get_template:
+            warm_up()
+        ensure.assert_not_called()
+        self.assertEqual([call.args[0] for call in get_template.call_args_list], HOT_TEMPLATES)
+
+    def test_timeout_is_not_widened_for_imports(self):
+        with mock.patch.dict(os.environ, {'GUNICORN_TIMEOUT': '30', 'GUNICORN_IMPORT_TIMEOUT': '300'}):
+            config = importlib.reload(gunicorn_conf)
+        self.addCleanup(importlib.reload, gunicorn_conf)
+        self.assertEqual((config.worker_class, config.timeout), ('gthread', 30))
+
+
+@override_settings(PERFORMANCE_INSTRUMENTATION=True)
+class MetricsEndpointTests(TestCase):
+    """/metrics/ is closed unless a scrape token is configured and sent."""
+
+    def scrape(self, **headers):
+        return self.client.get('/metrics/', secure=True, **headers)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_hidden_without_token(self):
+        self.assertEqual(self.scrape().status_code, 404)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_requires_bearer_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+
+class QueryRepeatDetectionTests(TestCase):
+    """The N+1 detector, and pages that used to issue N+1 queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser('manager', password='password', role=User.MANAGER)
+        counsellors = [User.objects.create_user(f'counsellor{i}', role=User.SALES) for i in range(8)]
+        for i in range(24):
+            customer = Customer.objects.create(
+                phone_number=f'90000000{i:02d}',
+                name=f'Customer {i}',
+                assigned_to=counsellors[i % len(counsellors)],
+                status=CustomerStatus.VALID,
+            )
+            CustomerStatusHistory.objects.create(
+                customer=customer, new_status=CustomerStatus.VALID, changed_by=counsellors[0]
+            )
+
+    def test_repeated_query_shape_raises(self):
+        ids = list(Customer.objects.values_list('id', flat=True))
+        with self.assertRaises(NPlusOneError):
+            with detect_repeated_queries('loop', threshold=5, raise_error=True):
+                for customer_id in ids:
+                    Customer.objects.get(id=customer_id)
+
+    def test_batched_query_is_not_flagged(self):
+        with detect_repeated_queries(threshold=5, raise_error=True) as detector:
+            customers = list(Customer.objects.select_related('assigned_to'))
+            [customer.assigned_to.username for customer in customers]
+        self.assertEqual(detector.repeated, {})
+
+    def test_manager_dashboard(self):
+        self.client.force_login(self.manager)
+        self.assertEqual(self.client.get('/', secure=True).status_code, 200)
+
+    def test_customer_admin_changelist(self):
+        self.client.force_login(self.manager)
+        response = self.client.get('/admin/customer/customer/', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_status_history_admin_changelist(self):
+        self.client.force_login(self.manager)
+        response = self.client.get('/admin/customer/customerstatushistory/', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+
+class HealthCheckTests(TestCase):
+    """Liveness, readiness and the cached deep check."""
+
+    def setUp(self):
+        health._deep_result = None
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def test_live_does_not_touch_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/live/', secure=True)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_ready_reports_database_latency_only(self):
+        response = self.client.get('/health/ready/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(set(body), {'status', 'database'})
+        self.assertEqual(body['database']['status'], 'ok')
+        self.assertEqual(body['database']['connection'], 'reused')
+
+    @override_settings(HEALTH_DB_DEADLINE_MS=-1)
+    def test_ready_fails_past_the_deadline(self):
+        response = self.client.get('/health/ready/', secure=True)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['database']['status'], 'slow')
+
+    def test_deep_checks_are_cached(self):
+        response = self.client.get('/health/deep/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        checks = response.json()['checks']
+        self.assertEqual(checks['migrations'], {'status': 'ok', 'pending': 0})
+        self.assertEqual(checks['storage'], {'status': 'ok'})
+
+        # Only the readiness query runs until the interval has passed
+        with self.assertNumQueries(1):
+            response = self.client.get('/health/deep/', secure=True)
+        self.assertEqual(response.json()['checks'], checks)
+
+    def test_deep_reports_stalled_imports_without_failing(self):
+        manager = User.objects.create_user('manager', role=User.MANAGER)
+        file_import = FileImport.objects.create(file_name='customers.csv', file='imports/customers.csv', imported_by=manager)
+        FileImport.objects.filter(pk=file_import.pk).update(imported_at=file_import.imported_at - timedelta(hours=1))
+
+        response = self.client.get('/health/deep/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'degraded')
+        self.assertEqual(response.json()['checks']['imports'], {'status': 'stalled', 'unfinished': 1, 'stalled': 1})
+
+    def test_finished_empty_import_is_not_stalled(self):
+        manager = User.objects.create_user('manager', role=User.MANAGER)
+        self.client.force_login(manager)
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with override_settings(MEDIA_ROOT=media_root.name):
+            self.client.post('/import/', {'file': SimpleUploadedFile('empty.csv', b'phone_number,name\n')}, secure=True)
+
+        file_import = FileImport.objects.get()
+        self.assertEqual(file_import.total_records, 0)
+        self.assertIsNotNone(file_import.completed_at)
+        FileImport.objects.update(imported_at=file_import.imported_at - timedelta(hours=1))
+        self.assertEqual(health.check_imports(), {'status': 'ok', 'unfinished': 0, 'stalled': 0})
+
+
+class StaticAssetTests(TestCase):
+    """Pages must use the assets built by ``build_assets``, not runtime CDNs."""
+
+    def test_pages_load_no_runtime_cdn_assets(self):
+        manager = User.objects.create_user('manager', role=User.MANAGER)
+        self.client.force_login(manager)
+        for url in ('/', '/customer-status/'):
+            content = self.client.get(url, secure=True).content.decode()
+            self.assertIn('/static/dist/app.css', content)
+            self.assertNotIn('cdn.tailwindcss.com', content)
+            self.assertNotIn('cdn.jsdelivr.net', content)
+
+
+class ImportUploadTests(TestCase):
+    """Uploads are stored once, hashed, and byte-identical re-uploads are caught."""
+
+    CSV = b'phone_number,name,area\n9100000001,Asha,North\n9100000002,Ravi,South\n'
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.imports_dir = os.path.join(media_root.name, 'imports')
+
+        manager = User.objects.create_user('manager', role=User.MANAGER)
+        self.client.force_login(manager)
+
+    def upload(self, **data):
+        return self.client.post(
+            '/import/', {'file': SimpleUploadedFile('customers.csv', self.CSV), **data}, secure=True
+        )
+
+    def test_upload_is_stored_once_and_hashed(self):
+        self.upload()
+        file_import = FileImport.objects.get()
+        self.assertEqual(file_import.content_hash, hashlib.sha256(self.CSV).hexdigest())
+        self.assertEqual(file_import.successful_records, 2)
+        self.assertEqual(os.listdir(self.imports_dir), ['customers.csv'])
+        self.assertEqual(Customer.objects.count(), 2)
+
+    def test_identical_reupload_is_not_processed(self):
+        self.upload()
+        response = self.upload()
+        self.assertEqual(FileImport.objects.count(), 1)
+        self.assertEqual(os.listdir(self.imports_dir), ['customers.csv'])
+        self.assertTrue(any('already imported' in str(message) for message in response.wsgi_request._messages))
+
+    def test_reimport_reuses_the_stored_file(self):
+        self.upload()
+        self.upload(reimport='1')
+        self.assertEqual(FileImport.objects.count(), 2)
+        self.assertEqual(set(FileImport.objects.values_list('file', flat=True)), {'imports/customers.csv'})
+        self.assertEqual(os.listdir(self.imports_dir), ['customers.csv'])
+
+    def stored_files(self):
+        return os.listdir(self.imports_dir) if os.path.isdir(self.imports_dir) else []
+
+    def test_upload_without_csrf_token_is_rejected_and_removed(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.get(username='manager'))
+        response = client.post('/import/', {'file': SimpleUploadedFile('customers.csv', self.CSV)}, secure=True)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(FileImport.objects.exists())
+
+    def test_non_manager_upload_is_not_stored(self):
+        self.client.force_login(User.objects.create_user('counsellor', role=User.SALES))
+        self.assertEqual(self.upload().status_code, 403)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_invalid_file_is_removed(self):
+        self.CSV = b'name,area\nAsha,North\n'
+        self.upload()
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(FileImport.objects.exists())
+
+
+class StatementTimeoutTests(SimpleTestCase):
+    def test_limit_is_sent_with_each_statement(self):
+        timeout = StatementTimeout(5000)
+        executed = []
+
+        def execute(sql, params, many, context):
+            executed.append(sql)
+
+        plain = {'cursor': SimpleNamespace(cursor=SimpleNamespace(name=None))}
+        server_side = {'cursor': SimpleNamespace(cursor=SimpleNamespace(name='_django_curs_1'))}
+        timeout(execute, 'SELECT 1', None, False, plain)
+        timeout(execute, 'INSERT INTO t VALUES (%s)', [(1,), (2,)], True, plain)
+        timeout(execute, 'SELECT 2', None, False, server_side)
+
+        self.assertEqual(executed, [
+            'SET LOCAL statement_timeout = 5000; SELECT 1',
+            'INSERT INTO t VALUES (%s)',
+            'SELECT 2',
+        ])
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReadReplicaTests(TestCase):
+    """Dashboards read from the replica unless the client just wrote or the replica can't be trusted."""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', role=User.MANAGER)
+        for i in range(3):
+            Customer.objects.create(phone_number=f'920000000{i}', name=f'Primary {i}')
+        Customer.objects.using('replica').create(phone_number='9300000000', name='Replica')
+
+    def setUp(self):
+        core.db._replica_checked_at = None
+        self.client.force_login(self.manager)
+
+    def total_customers(self):
+        return self.client.get('/customer-status/', secure=True).context['total_customers']
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.total_customers(), 1)
+
+    def post_status_change(self, updates):
+        # Run commit hooks straight away, as they would outside the test transaction
+        with mock.patch('django.db.transaction.on_commit', lambda func, *args, **kwargs: func()):
+            return self.client.post(
+                '/customers/batch-update-status/', json.dumps({'updates': updates}),
+                content_type='application/json', secure=True,
+            )
+
+    def test_client_reads_primary_after_writing(self):
+        customer = Customer.objects.first()
+        response = self.post_status_change([{'customer_id': str(customer.pk), 'status': CustomerStatus.INVALID}])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(self.total_customers(), 3)
+
+    def test_failed_requests_and_logins_do_not_pin(self):
+        response = self.post_status_change([])
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        self.manager.set_password('secret')
+        self.manager.save()
+        self.client.logout()
+        response = self.client.post('/login/', {'username': 'manager', 'password': 'secret'}, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with mock.patch('core.db.replica_lag', side_effect=DatabaseError), self.assertLogs('core.db', 'WARNING'):
+            self.assertEqual(self.total_customers(), 3)
+
+    @override_settings(REPLICA_MAX_LAG_SECONDS=5)
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch('core.db.replica_lag', return_value=30.0), self.assertLogs('core.db', 'WARNING'):
+            self.assertEqual(self.total_customers(), 3)
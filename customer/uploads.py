@@ -0,0 +1,100 @@
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+IMPORT_EXTENSIONS = ('.xlsx', '.csv')
+IMPORT_UPLOAD_TO = 'imports/'
+
+
+class StoredUpload(UploadedFile):
+    """
+    An import that is already in media storage. ``storage_name`` is what
+    ``FileImport.file`` should point at and ``path`` is where to parse it.
+    Unless ``keep()`` is called it is deleted when the request ends.
+    """
+
+    def __init__(self, name, storage_name, path, size, content_type, charset, content_hash):
+        super().__init__(None, name, content_type, size, charset)
+        self.storage_name = storage_name
+        self.path = path
+        self.content_hash = content_hash
+        self.kept = False
+
+    def keep(self):
+        self.kept = True
+
+    def delete(self):
+        default_storage.delete(self.storage_name)
+
+
+class ImportUploadHandler(FileUploadHandler):
+    """
+    Writes the ``file`` field of an import straight to its final place under
+    ``imports/`` in media storage, hashing it (SHA-256) on the way, so the
+    upload is written to disk once and never held in memory or a temp file.
+    Other fields and files with other extensions are left to the next
+    handler. Needs a storage with local paths (``FileSystemStorage``).
+
+    The view calls ``discard_unkept()`` once the request is over, so a
+    rejected request (CSRF failure, invalid or duplicate file, failed
+    import) leaves nothing behind.
+    """
+
+    field_name = 'file'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.uploads = []
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.destination = None
+        if field_name != self.field_name or os.path.splitext(file_name)[1].lower() not in IMPORT_EXTENSIONS:
+            return
+
+        self.hash = hashlib.sha256()
+        name = default_storage.generate_filename(IMPORT_UPLOAD_TO + os.path.basename(file_name))
+        while True:
+            self.storage_name = default_storage.get_available_name(name)
+            self.path = default_storage.path(self.storage_name)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            try:
+                # O_EXCL: another upload may have claimed the same name since get_available_name
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+            except FileExistsError:
+                continue
+            self.destination = os.fdopen(fd, 'wb')
+            break
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.destination is None:
+            return raw_data
+        self.hash.update(raw_data)
+        self.destination.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.destination is None:
+            return None
+        self.destination.close()
+        self.destination = None
+        upload = StoredUpload(
+            self.file_name, self.storage_name, self.path, file_size,
+            self.content_type, self.charset, self.hash.hexdigest(),
+        )
+        self.uploads.append(upload)
+        return upload
+
+    def upload_interrupted(self):
+        if self.destination is not None:
+            self.destination.close()
+            self.destination = None
+            os.remove(self.path)
+
+    def discard_unkept(self):
+        for upload in self.uploads:
+            if not upload.kept:
+                upload.delete()
@@ -19,7 +19,11 @@ urlpatterns = [
     path('customers/', views.customer_list, name='customer_list'),
     path('customers/<uuid:customer_id>/', views.customer_detail, name='customer_detail'),
     path('customers/<uuid:customer_id>/update-status/', views.update_customer_status, name='update_customer_status'),
+    path('customers/batch-update-status/', views.batch_update_customer_status, name='batch_update_customer_status'),
     path('customers/<uuid:customer_id>/assign/', views.assign_customer, name='assign_customer'),
+    path('customers/<uuid:customer_id>/history/', views.customer_history, name='customer_history'),
+    path('customers/<uuid:customer_id>/assignment/', views.customer_assignment_widget, name='customer_assignment_widget'),
+    path('customers/<uuid:customer_id>/history/archived/', views.archived_customer_history, name='archived_customer_history'),
     path('customers/unassigned/', views.unassigned_customers, name='unassigned_customers'),
     path('customers/bulk-assign/', views.bulk_assign_customers, name='bulk_assign_customers'),
     path('customers/random-assign/', views.random_assign_customers, name='random_assign_customers'),
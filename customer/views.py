@@ -2,16 +2,29 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.http import JsonResponse, HttpResponseForbidden
-from django.db.models import Count, Q
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
 from django.core.paginator import Paginator
 from django.utils import timezone
-from .models import User, Customer, FileImport, CustomerStatus, CustomerStatusHistory, FollowUpReminder
-from .forms import CustomerStatusForm, CustomerAssignForm
-import pandas as pd
+from django.utils.dateparse import parse_datetime
+from core.db import read_replica, statement_timeout
+from .models import Customer, CustomerEvent, FileImport, CustomerStatus, CustomerStatusHistory, FollowUpReminder
+from .forms import CustomerStatusForm
+from .facets import get_facet_counts, invalidate_facet_counts, normalize_search
+from .assignment import apply_assignment, assign_customers, auto_assign, claim_unassigned, RANDOM, STRATEGY_CHOICES
+from .events import record, record_many
+from .reminders import due_reminders, summary_counts
+from .archive import archived_history, has_archived_history
+from .roster import counsellors, get_counsellor, get_roster
+from .dashboards import counsellor_status_counts, customer_totals, recent_imports, run_concurrently, status_distribution
+from .uploads import IMPORT_EXTENSIONS, ImportUploadHandler
+from .services import batch_update_status, transition_status, StatusConflict, MAX_BATCH_SIZE
+import json
 import os
-import random
-import tempfile
+import uuid
 
 
 # Authentication Views
@@ -42,73 +55,55 @@ def dashboard(request):
     else:
         return sales_dashboard(request)
 
+def _counsellors_with_reminders():
+    sales_users = counsellors()
+    return sales_users, summary_counts([user.id for user in sales_users])
+
 @login_required
+@read_replica
 def manager_dashboard(request):
     if not request.user.is_manager():
         return HttpResponseForbidden("You don't have permission to access this page.")
 
-    total_customers = Customer.objects.count()
-    assigned_customers = Customer.objects.filter(assigned_to__isnull=False).count()
-    unassigned_customers = Customer.objects.filter(assigned_to__isnull=True).count()
-
-    # Get counts for each status
-    status_counts = Customer.objects.values('status').annotate(count=Count('status'))
-    status_data = {status['status']: status['count'] for status in status_counts}
-
-    # Make sure all statuses are represented in the data, even if count is 0
-    for status in CustomerStatus.values:
-        if status not in status_data:
-            status_data[status] = 0
-
-    recent_imports = FileImport.objects.all()[:5]
+    # The aggregates don't depend on each other, so they run concurrently
+    totals, status_data, recent, user_status_counts, (sales_users, reminder_summaries) = run_concurrently(
+        customer_totals,
+        status_distribution,
+        recent_imports,
+        counsellor_status_counts,
+        _counsellors_with_reminders,
+    )
+    total_customers, assigned_customers, unassigned_customers = totals
 
-    sales_users = User.objects.filter(role=User.SALES)
     sales_performance = []
-
     for user in sales_users:
-        user_data = {
+        counts = user_status_counts.get(user.id, {})
+        sales_performance.append({
             'user': user,
-            'assigned_count': Customer.objects.filter(assigned_to=user).count(),
-            'status_counts': {}
-        }
-
-        for status in CustomerStatus.values:
-            user_data['status_counts'][status] = Customer.objects.filter(
-                assigned_to=user, status=status
-            ).count()
-
-        sales_performance.append(user_data)
+            'assigned_count': sum(counts.values()),
+            'reminders': reminder_summaries[user.id],
+            'status_counts': {status: counts.get(status, 0) for status in CustomerStatus.values}
+        })
 
     context = {
         'total_customers': total_customers,
         'assigned_customers': assigned_customers,
         'unassigned_customers': unassigned_customers,
         'status_data': status_data,
-        'recent_imports': recent_imports,
+        'recent_imports': recent,
         'sales_performance': sales_performance
     }
 
     return render(request, 'customer/manager_dashboard.html', context)
 
 @login_required
+@read_replica
 def customer_status(request):
     """View for the Customer Status Distribution page"""
-    if not request.user.is_authenticated:
-        return redirect('login')
-
-    total_customers = Customer.objects.count()
-
-    # Get counts for each status
-    status_counts = Customer.objects.values('status').annotate(count=Count('status'))
-    status_data = {status['status']: status['count'] for status in status_counts}
-
-    # Make sure all statuses are represented in the data, even if count is 0
-    for status in CustomerStatus.values:
-        if status not in status_data:
-            status_data[status] = 0
+    totals, status_data = run_concurrently(customer_totals, status_distribution)
 
     context = {
-        'total_customers': total_customers,
+        'total_customers': totals[0],
         'status_data': status_data,
         'page_title': 'Customer Status Distribution'
     }
@@ -140,13 +135,10 @@ def sales_dashboard(request):
         changed_by=request.user
     ).select_related('customer').order_by('-changed_at')[:10]
 
-    # Get today's follow-up reminders
-    today = timezone.now().date()
-    todays_followups = FollowUpReminder.objects.filter(
-        counselor=request.user,
-        follow_up_date=today,
-        is_completed=False
-    ).select_related('customer').order_by('created_at')
+    # Follow-ups due today plus any still overdue, oldest first
+    today = timezone.localdate()
+    todays_followups = list(due_reminders(request.user, today))
+    reminder_summary = summary_counts([request.user.id])[request.user.id]
 
     # Pagination for assigned customers
     recent_customers = assigned_customers.order_by('-updated_at')
@@ -162,6 +154,7 @@ def sales_dashboard(request):
         'page_obj': page_obj,  # For pagination template
         'statuses': statuses,
         'todays_followups': todays_followups,
+        'reminder_summary': reminder_summary,
         'today': today
     }
 
@@ -169,10 +162,25 @@ def sales_dashboard(request):
 
 # File Import Views
 @login_required
+@statement_timeout('import')
+@csrf_exempt
 def import_file(request):
     if not request.user.is_manager():
         return HttpResponseForbidden("You don't have permission to access this page.")
 
+    # Upload handlers can only be swapped before the body is read, which the
+    # CSRF check would do, so the check runs in _import_file instead. Any
+    # upload the import doesn't keep is removed however the request ends.
+    handler = ImportUploadHandler(request)
+    request.upload_handlers.insert(0, handler)
+    try:
+        return _import_file(request)
+    finally:
+        handler.discard_unkept()
+
+
+@csrf_protect
+def _import_file(request):
     if request.method == 'POST':
         if 'file' not in request.FILES:
             messages.error(request, 'Please select a file to upload')
@@ -181,27 +189,46 @@ def import_file(request):
         file = request.FILES['file']
         file_name = file.name
         file_ext = os.path.splitext(file_name)[1].lower()
-        if file_ext not in ['.xlsx', '.csv']:
+        if file_ext not in IMPORT_EXTENSIONS:
             messages.error(request, 'Only XLSX and CSV files are supported')
             return redirect('import_file')
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            for chunk in file.chunks():
-                temp_file.write(chunk)
-            temp_file_path = temp_file.name
+        previous = (
+            FileImport.objects.filter(content_hash=file.content_hash)
+            .select_related('imported_by')
+            .first()
+        )
+        if previous and not request.POST.get('reimport'):
+            messages.warning(
+                request,
+                f'This exact file was already imported as "{previous.file_name}" by '
+                f'{previous.imported_by.get_full_name() or previous.imported_by.username} on '
+                f'{timezone.localtime(previous.imported_at):%Y-%m-%d %H:%M} '
+                f'({previous.successful_records} records). Tick "Import again" to process it anyway.'
+            )
+            return redirect('import_history')
+        if previous:
+            # Same bytes: point at the copy already in storage instead of keeping two
+            stored_name, stored_path = previous.file.name, previous.file.path
+        else:
+            stored_name, stored_path = file.storage_name, file.path
 
         file_import = FileImport.objects.create(
             file_name=file_name,
-            file=file,
+            file=stored_name,
+            content_hash=file.content_hash,
             imported_by=request.user
         )
 
+        # pandas (and numpy) cost every worker ~180ms and tens of MB, so only imports load them
+        import pandas as pd
+
         try:
+            # Parse the stored file in place; CSVs are memory-mapped rather than read into a buffer
             if file_ext == '.xlsx':
-                df = pd.read_excel(temp_file_path)
+                df = pd.read_excel(stored_path)
             else:
-                df = pd.read_csv(temp_file_path)
-            os.unlink(temp_file_path)
+                df = pd.read_csv(stored_path, memory_map=True)
 
             required_columns = ['phone_number']
             for col in required_columns:
@@ -286,25 +313,54 @@ def import_file(request):
                 except Exception as e:
                     failed_records += 1
 
-            if update_objs:
-                Customer.objects.bulk_update(update_objs, ['name', 'area', 'date', 'remark'])
+            # The rows and their import events commit together
+            with transaction.atomic():
+                if update_objs:
+                    for customer in update_objs:
+                        customer.version = F('version') + 1
+                    Customer.objects.bulk_update(update_objs, ['name', 'area', 'date', 'remark', 'version'])
+
+                inserted = []
+                if new_objs:
+                    try:
+                        with transaction.atomic():
+                            Customer.objects.bulk_create(new_objs, batch_size=1000, ignore_conflicts=True)
+                    except Exception as e:
+                        # If bulk_create fails, try one by one to handle unique constraint violations
+                        for obj in new_objs:
+                            try:
+                                with transaction.atomic():
+                                    obj.save()
+                            except Exception:
+                                pass
+                    # ignore_conflicts silently drops rows another import inserted
+                    # first, so look up which of the new ids actually landed
+                    saved = set(
+                        Customer.objects.filter(pk__in=[obj.pk for obj in new_objs]).values_list('pk', flat=True)
+                    )
+                    inserted = [obj for obj in new_objs if obj.pk in saved]
+                    failed_records += len(new_objs) - len(inserted)
+                    successful_records -= len(new_objs) - len(inserted)
+
+                record_many(
+                    CustomerEvent.IMPORT,
+                    [(obj.pk, None, file_import.pk) for obj in update_objs + inserted],
+                    actor=request.user,
+                )
+            invalidate_facet_counts()
 
-            if new_objs:
-                try:
-                    Customer.objects.bulk_create(new_objs, batch_size=1000, ignore_conflicts=True)
-                except Exception as e:
-                    # If bulk_create fails, try one by one to handle unique constraint violations
-                    for obj in new_objs:
-                        try:
-                            obj.save()
-                        except Exception:
-                            failed_records += 1
-                            successful_records -= 1
+            if settings.AUTO_ASSIGN_AFTER_IMPORT:
+                result = auto_assign(customers=Customer.objects.filter(phone_number__in=phone_numbers))
+                if result.assigned:
+                    messages.info(request, f'{result.assigned} new customers auto-assigned to student counsellors.')
 
             file_import.total_records = len(df)
             file_import.successful_records = successful_records
             file_import.failed_records = failed_records
+            file_import.completed_at = timezone.now()
             file_import.save()
+            if not previous:
+                file.keep()
 
             messages.success(
                 request,
@@ -314,13 +370,14 @@ def import_file(request):
         except Exception as e:
             messages.error(request, f'Error processing file: {str(e)}')
             file_import.delete()
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
 
         return redirect('import_history')
 
     return render(request, 'customer/import_file.html')
 
+@login_required
+@read_replica
+@statement_timeout('list')
 def import_history(request):
     if not request.user.is_manager():
         return HttpResponseForbidden("You don't have permission to access this page.")
@@ -335,6 +392,7 @@ def import_history(request):
 
 # Customer Management Views
 @login_required
+@statement_timeout('list')
 def customer_list(request):
     # Use select_related to optimize the query for assigned_to
     if request.user.is_manager():
@@ -349,13 +407,18 @@ def customer_list(request):
 
     # Search functionality
     search_query = request.GET.get('search')
-    if search_query:
+    # The same normalized text drives the filter and the facet cache key
+    search = normalize_search(search_query)
+    if search:
         customers = customers.filter(
-            Q(name__icontains=search_query) |
-            Q(phone_number__icontains=search_query) |
-            Q(area__icontains=search_query)
+            Q(name__icontains=search) |
+            Q(phone_number__icontains=search) |
+            Q(area__icontains=search)
         )
 
+    # Facet counts for the active filter (single grouped query, cached)
+    facets = get_facet_counts(customers, request.user, status_filter, search)
+
     # Pagination
     paginator = Paginator(customers, 25)  # Show 25 customers per page
     page_number = request.GET.get('page')
@@ -366,52 +429,156 @@ def customer_list(request):
         'page_obj': page_obj,  # For pagination template
         'statuses': CustomerStatus.choices,
         'current_status': status_filter,
-        'search_query': search_query
+        'search_query': search_query,
+        'facets': facets
     }
 
     return render(request, 'customer/customer_list.html', context)
 
+# Status history entries per page of the customer_detail history fragment
+HISTORY_PAGE_SIZE = 20
+
+def _can_view_customer(user, customer):
+    return user.is_manager() or customer.assigned_to_id == user.id
+
+def _wants_json(request):
+    return request.GET.get('format') == 'json'
+
 @login_required
 def customer_detail(request, customer_id):
-    customer = get_object_or_404(Customer, id=customer_id)
+    # Customer, assignee and open reminder date in one query; history and the
+    # assignment widget are loaded by the page afterwards
+    open_reminder = FollowUpReminder.objects.filter(
+        customer=OuterRef('pk'),
+        is_completed=False
+    ).order_by('-created_at')
+    customer = get_object_or_404(
+        Customer.objects.select_related('assigned_to').annotate(
+            follow_up_date=Subquery(open_reminder.values('follow_up_date')[:1])
+        ),
+        id=customer_id
+    )
 
     # Check if user has permission to view this customer
-    if not request.user.is_manager() and customer.assigned_to != request.user:
+    if not _can_view_customer(request.user, customer):
         return HttpResponseForbidden("You don't have permission to view this customer.")
 
-    status_history = customer.status_history.all().order_by('-changed_at')
-
-    # Get any existing follow-up reminder
-    follow_up_reminder = None
-    try:
-        follow_up_reminder = FollowUpReminder.objects.filter(
-            customer=customer,
-            is_completed=False
-        ).latest('created_at')
-    except FollowUpReminder.DoesNotExist:
-        pass
-
-    # Initialize forms
-    initial_data = {'status': customer.status}
-    if follow_up_reminder and customer.status == CustomerStatus.FOLLOW_UP:
-        initial_data['follow_up_date'] = follow_up_reminder.follow_up_date
-
-    status_form = CustomerStatusForm(initial=initial_data)
-    assign_form = CustomerAssignForm(initial={'assigned_to': customer.assigned_to})
-
     context = {
         'customer': customer,
-        'status_history': status_history,
         'statuses': CustomerStatus.choices,
-        'status_form': status_form,
-        'assign_form': assign_form,
-        'sales_users': User.objects.filter(role=User.SALES),
         'today': timezone.now().date(),
-        'follow_up_reminder': follow_up_reminder
     }
 
     return render(request, 'customer/customer_detail.html', context)
 
+@login_required
+@read_replica
+@statement_timeout('list')
+def customer_history(request, customer_id):
+    """
+    One page of a customer's status history, newest first, as an HTML
+    fragment (or JSON with ``?format=json``). Pages are keyed by the
+    ``before`` cursor returned with the previous page, in the
+    ``X-Next-Cursor`` header for fragments.
+    """
+    customer = get_object_or_404(Customer.objects.only('id', 'assigned_to_id'), id=customer_id)
+    if not _can_view_customer(request.user, customer):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    history = CustomerStatusHistory.objects.filter(customer_id=customer.id)
+    cursor = request.GET.get('before')
+    if cursor:
+        changed_at, _, history_id = cursor.partition('|')
+        try:
+            # parse_datetime returns None for a malformed value but raises
+            # for a well-formed one that is out of range
+            changed_at = parse_datetime(changed_at)
+            history_id = uuid.UUID(history_id)
+        except ValueError:
+            changed_at = None
+        if changed_at is None:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        history = history.filter(Q(changed_at__lt=changed_at) | Q(changed_at=changed_at, id__lt=history_id))
+
+    entries = list(history.select_related('changed_by').order_by('-changed_at', '-id')[:HISTORY_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(entries) > HISTORY_PAGE_SIZE:
+        entries = entries[:HISTORY_PAGE_SIZE]
+        next_cursor = f'{entries[-1].changed_at.isoformat()}|{entries[-1].id}'
+
+    # Only look for archived entries once the hot history is exhausted
+    has_archived = next_cursor is None and has_archived_history(customer)
+
+    if _wants_json(request):
+        return JsonResponse({
+            'entries': [
+                {
+                    'id': str(entry.id),
+                    'previous_status': entry.previous_status,
+                    'previous_status_display': entry.get_previous_status_display() if entry.previous_status else None,
+                    'new_status': entry.new_status,
+                    'new_status_display': entry.get_new_status_display(),
+                    'changed_by': entry.changed_by.get_full_name() or entry.changed_by.username,
+                    'changed_at': entry.changed_at.isoformat(),
+                    'notes': entry.notes,
+                }
+                for entry in entries
+            ],
+            'next_cursor': next_cursor,
+            'has_archived': has_archived
+        })
+
+    response = render(request, 'includes/customer_history.html', {
+        'status_history': entries,
+        'first_page': not cursor
+    })
+    response['X-Next-Cursor'] = next_cursor or ''
+    response['X-Has-Archived'] = 'true' if has_archived else 'false'
+    return response
+
+@login_required
+def customer_assignment_widget(request, customer_id):
+    """The manager-only assignment form for customer_detail, as an HTML fragment or JSON."""
+    if not request.user.is_manager():
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    customer = get_object_or_404(Customer.objects.only('id', 'assigned_to_id'), id=customer_id)
+    sales_users = counsellors()
+
+    if _wants_json(request):
+        return JsonResponse({
+            'assigned_to': customer.assigned_to_id,
+            'counsellors': [
+                {'id': sales_user.id, 'name': sales_user.display_name}
+                for sales_user in sales_users
+            ]
+        })
+
+    return render(request, 'includes/customer_assignment.html', {
+        'customer': customer,
+        'sales_users': sales_users
+    })
+
+@login_required
+@read_replica
+@statement_timeout('list')
+def archived_customer_history(request, customer_id):
+    customer = get_object_or_404(Customer.objects.only('id', 'assigned_to_id'), id=customer_id)
+
+    if not _can_view_customer(request.user, customer):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid offset'}, status=400)
+
+    entries, has_more = archived_history(customer, offset=offset)
+    return JsonResponse({
+        'entries': entries,
+        'next_offset': offset + len(entries) if has_more else None
+    })
+
 @login_required
 def update_customer_status(request, customer_id):
     if request.method != 'POST':
@@ -434,52 +601,54 @@ def update_customer_status(request, customer_id):
     if not new_status or new_status not in dict(CustomerStatus.choices):
         return JsonResponse({'error': 'Invalid status'}, status=400)
 
-    previous_status = customer.status
-    customer.status = new_status
-    customer.save()
-
-    # Create status history record
-    status_history = CustomerStatusHistory.objects.create(
-        customer=customer,
-        previous_status=previous_status,
-        new_status=new_status,
-        changed_by=request.user,
-        notes=notes
-    )
-
-    # Handle follow-up reminder creation/update
-    if new_status == CustomerStatus.FOLLOW_UP and follow_up_date:
-        # Check if there's an existing active follow-up reminder
-        try:
-            reminder = FollowUpReminder.objects.get(
-                customer=customer,
-                is_completed=False
-            )
-            # Update existing reminder
-            reminder.follow_up_date = follow_up_date
-            reminder.notes = notes
-            reminder.status_history = status_history
-            reminder.save()
-        except FollowUpReminder.DoesNotExist:
-            # Create new reminder
-            FollowUpReminder.objects.create(
-                customer=customer,
-                counselor=request.user,
-                follow_up_date=follow_up_date,
-                notes=notes,
-                status_history=status_history
-            )
-    # Mark follow-up as completed if status changed from FOLLOW_UP to something else
-    elif previous_status == CustomerStatus.FOLLOW_UP and new_status != CustomerStatus.FOLLOW_UP:
-        FollowUpReminder.objects.filter(
-            customer=customer,
-            is_completed=False
-        ).update(is_completed=True)
+    try:
+        transition_status(
+            request.user,
+            customer,
+            new_status,
+            notes=notes,
+            follow_up_date=follow_up_date,
+            expected_version=form.cleaned_data.get('version')
+        )
+    except StatusConflict as conflict:
+        return JsonResponse({
+            'error': 'This customer was updated by someone else. Please reload and try again.',
+            'conflict': True,
+            'status': conflict.status,
+            'version': conflict.version
+        }, status=409)
 
     return JsonResponse({
         'success': True,
         'status': new_status,
-        'status_display': dict(CustomerStatus.choices)[new_status]
+        'status_display': dict(CustomerStatus.choices)[new_status],
+        'version': customer.version
+    })
+
+@login_required
+def batch_update_customer_status(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    try:
+        updates = json.loads(request.body).get('updates')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+
+    if not isinstance(updates, list) or not updates:
+        return JsonResponse({'error': 'No updates provided'}, status=400)
+
+    if len(updates) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'At most {MAX_BATCH_SIZE} updates per request'}, status=400)
+
+    results = batch_update_status(request.user, updates)
+    updated = sum(1 for result in results if result['success'])
+
+    return JsonResponse({
+        'success': True,
+        'updated': updated,
+        'failed': len(results) - updated,
+        'results': results
     })
 
 @login_required
@@ -491,28 +660,34 @@ def assign_customer(request, customer_id):
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     customer = get_object_or_404(Customer, id=customer_id)
+    previous_assignee = customer.assigned_to_id
     sales_user_id = request.POST.get('sales_user')
 
+    sales_user = None
     if sales_user_id:
-        sales_user = get_object_or_404(User, id=sales_user_id, role=User.SALES)
-        customer.assigned_to = sales_user
-    else:
-        customer.assigned_to = None
+        sales_user = get_counsellor(sales_user_id)
+        if sales_user is None:
+            return JsonResponse({'error': 'Student counsellor not found'}, status=404)
 
-    customer.save()
+    customer.assigned_to_id = sales_user.id if sales_user else None
+    with transaction.atomic():
+        customer.save(update_fields=['assigned_to', 'updated_at'])
+        if customer.assigned_to_id != previous_assignee:
+            record(CustomerEvent.ASSIGNMENT, customer.pk, previous_assignee, customer.assigned_to_id, actor=request.user)
 
     return JsonResponse({
         'success': True,
-        'assigned_to': customer.assigned_to.username if customer.assigned_to else None
+        'assigned_to': sales_user.username if sales_user else None
     })
 
 @login_required
+@statement_timeout('list')
 def unassigned_customers(request):
     if not request.user.is_manager():
         return HttpResponseForbidden("You don't have permission to access this page.")
 
     customers = Customer.objects.filter(assigned_to__isnull=True).order_by('-created_at')
-    sales_users = User.objects.filter(role=User.SALES)
+    sales_users = counsellors()
 
     # Pagination
     paginator = Paginator(customers, 25)  # Show 25 customers per page
@@ -522,7 +697,8 @@ def unassigned_customers(request):
     context = {
         'customers': page_obj,
         'page_obj': page_obj,  # For pagination template
-        'sales_users': sales_users
+        'sales_users': sales_users,
+        'assignment_strategies': STRATEGY_CHOICES
     }
 
     return render(request, 'customer/unassigned_customers.html', context)
@@ -540,7 +716,10 @@ def bulk_assign_customers(request):
         messages.error(request, 'Please select a student counsellor')
         return redirect('unassigned_customers')
 
-    sales_user = get_object_or_404(User, id=sales_user_id, role=User.SALES)
+    sales_user = get_counsellor(sales_user_id)
+    if sales_user is None:
+        messages.error(request, 'Student counsellor not found')
+        return redirect('unassigned_customers')
 
     # Handle bulk assignment (100, 200, 500)
     if bulk_count and bulk_count != '0':
@@ -550,27 +729,20 @@ def bulk_assign_customers(request):
                 messages.error(request, 'Invalid bulk assignment count')
                 return redirect('unassigned_customers')
 
-            # Get the specified number of unassigned customers
-            unassigned_customers = Customer.objects.filter(assigned_to__isnull=True).order_by('-created_at')
-            total_available = unassigned_customers.count()
+            # Claim the newest unassigned customers in one statement; parallel
+            # assigners get disjoint sets
+            claimed = claim_unassigned(sales_user.id, count, actor=request.user)
 
-            if total_available == 0:
+            if claimed == 0:
                 messages.warning(request, 'No unassigned customers available')
                 return redirect('unassigned_customers')
 
-            if total_available < count:
-                messages.info(request, f'Only {total_available} unassigned customers available. Will assign all of them.')
-                count = total_available
-
-            unassigned_customers = unassigned_customers[:count]
-            unassigned_ids = [str(customer.id) for customer in unassigned_customers]
-
-            # Update customers
-            Customer.objects.filter(id__in=unassigned_ids).update(assigned_to=sales_user)
+            if claimed < count:
+                messages.info(request, f'Only {claimed} unassigned customers were available. All of them were assigned.')
 
             messages.success(
                 request,
-                f'{len(unassigned_ids)} customers assigned to {sales_user.get_full_name() or sales_user.username}'
+                f'{claimed} customers assigned to {sales_user.get_full_name() or sales_user.username}'
             )
 
             return redirect('unassigned_customers')
@@ -584,12 +756,15 @@ def bulk_assign_customers(request):
         messages.error(request, 'Please select at least one customer')
         return redirect('unassigned_customers')
 
-    # Update customers
-    Customer.objects.filter(id__in=customer_ids).update(assigned_to=sales_user)
+    # Update customers that are still unassigned; someone else may have claimed the rest
+    assigned = apply_assignment({sales_user.id: customer_ids}, only_unassigned=True, actor=request.user)[sales_user.id]
+
+    if assigned < len(customer_ids):
+        messages.warning(request, f'{len(customer_ids) - assigned} selected customers were already assigned by someone else')
 
     messages.success(
         request,
-        f'{len(customer_ids)} customers assigned to {sales_user.get_full_name() or sales_user.username}'
+        f'{assigned} customers assigned to {sales_user.get_full_name() or sales_user.username}'
     )
 
     return redirect('unassigned_customers')
@@ -599,7 +774,7 @@ def random_assign_customers(request):
     if not request.user.is_manager() or request.method != 'POST':
         return HttpResponseForbidden("You don't have permission to access this page.")
 
-    sales_users = list(User.objects.filter(role=User.SALES))
+    sales_users = get_roster()
     if not sales_users:
         messages.error(request, 'No student counsellors available for assignment')
         return redirect('unassigned_customers')
@@ -609,14 +784,22 @@ def random_assign_customers(request):
         messages.error(request, 'Please select at least one customer')
         return redirect('unassigned_customers')
 
-    # Assign customers randomly
-    for customer_id in customer_ids:
-        sales_user = random.choice(sales_users)
-        Customer.objects.filter(id=customer_id).update(assigned_to=sales_user)
+    strategy = request.POST.get('strategy', RANDOM)
+    if strategy not in dict(STRATEGY_CHOICES):
+        messages.error(request, 'Invalid assignment strategy')
+        return redirect('unassigned_customers')
+
+    # One grouped UPDATE per counsellor instead of one per customer
+    distribution = assign_customers(customer_ids, list(sales_users), strategy=strategy, actor=request.user)
 
+    assigned = sum(distribution.values())
+    summary = ', '.join(
+        f'{sales_users[user_id].get_full_name() or sales_users[user_id].username}: {count}'
+        for user_id, count in distribution.items() if count
+    )
     messages.success(
         request,
-        f'{len(customer_ids)} customers randomly assigned to student counsellors'
+        f'{assigned} customers distributed to student counsellors ({summary})'
     )
 
     return redirect('unassigned_customers')
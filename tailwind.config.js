@@ -0,0 +1,14 @@
+/** Tailwind build for static/dist/app.css; run `python manage.py build_assets`. */
+module.exports = {
+  // Every file that can contain class names. Classes built by string
+  // concatenation won't be found, so keep them whole (see customer/presentation.py).
+  content: [
+    './templates/**/*.html',
+    './customer/**/*.py',
+    './static/js/**/*.js',
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+}